@@ -0,0 +1,192 @@
+from collections import OrderedDict
+import logging
+import multiprocessing
+import os
+import yaml
+from procgame.dmd import AnimatedLayer, Animation, Frame
+
+class AnimationCache(object):
+    """LRU of the decoded animations, the least recently used animations are unloaded to stay within the byte budget.
+       A budget of 0 means no limit."""
+
+    def __init__(self, budget=0):
+        self.budget = budget
+        self.sizes = OrderedDict()
+        self.num_bytes = 0
+        self.loads = 0
+        self.evictions = 0
+
+    def add(self, animation, size):
+        self.sizes[animation] = size
+        self.num_bytes += size
+        self.loads += 1
+        # never unload the animation that was just decoded
+        while self.budget and self.num_bytes > self.budget and len(self.sizes) > 1:
+            (evicted, evicted_size) = self.sizes.popitem(last=False)
+            self.num_bytes -= evicted_size
+            self.evictions += 1
+            evicted.unload()
+
+    def touch(self, animation):
+        # move to the most recently used end, without a budget nothing is ever unloaded
+        if self.budget:
+            self.sizes[animation] = self.sizes.pop(animation)
+
+
+class LazyAnimation(object):
+    """Stands for the AnimatedLayer of an animation listed in the LazyAnimations section of asset_list.yaml.
+       The frames are decoded the first time the layer is used and they may be unloaded by the cache later.
+       The layer outlives its frames, an animation decoded again goes on from the frame it was showing.
+       Use add_load_hook() to modify the frames themselves."""
+
+    logger = logging.getLogger('game.animations')
+
+    def __init__(self, entry, path, cache, missing, pack=None):
+        # these attributes belong to the proxy, not to the layer
+        self.__dict__.update(entry=entry, path=path, cache=cache, missing=missing, pack=pack,
+                             layer=None, loaded=False, assigned=OrderedDict(), load_hooks=[])
+
+    def load(self, frames=None):
+        """Return the layer, decoding the frames if they are not loaded.
+           The frames can be given when they were decoded ahead of time, see preload_animations()."""
+        layer = self.layer
+        if not self.loaded:
+            if frames is None:
+                frames = self.decode()
+            if layer is None:
+                layer = self.create_layer(frames)
+            else:
+                layer.frames = frames
+            for hook in self.load_hooks:
+                hook(layer)
+            if self.layer is None:
+                for (name, value) in self.assigned.items():
+                    setattr(layer, name, value)
+            self.__dict__.update(layer=layer, loaded=True)
+            self.cache.add(self, sum(frame.width * frame.height for frame in layer.frames))
+        return layer
+
+    def next_frame(self):
+        # the layer is used once per display cycle, this is when the animation becomes the most recently used
+        layer = self.load()
+        self.cache.touch(self)
+        return layer.next_frame()
+
+    def composite_next(self, target):
+        layer = self.load()
+        self.cache.touch(self)
+        return layer.composite_next(target)
+
+    def decode(self):
+        frames = self.packed_frames()
+        if frames is not None:
+            return frames
+        try:
+            return Animation().load(self.path).frames
+        except IOError:
+            return self.missing_frames()
+
+    def packed_frames(self):
+        return self.pack.frames(self.path) if self.pack else None
+
+    def missing_frames(self):
+        self.logger.error('Cannot load animation %s from %s', self.entry['key'], self.path)
+        return [self.missing.frame] if hasattr(self.missing, 'frame') else self.missing.frames
+
+    def create_layer(self, frames):
+        entry = self.entry
+        layer = AnimatedLayer(frames=frames, frame_time=entry.get('frame_time', 1),
+                              repeat=entry.get('repeatAnim', False), hold=entry.get('holdLastFrame', False),
+                              opaque=entry.get('opaque', False))
+        if 'composite_op' in entry:
+            layer.composite_op = entry['composite_op']
+        return layer
+
+    def unload(self):
+        # the playback state stays with the layer
+        self.layer.frames = None
+        self.__dict__['loaded'] = False
+
+    def add_load_hook(self, hook):
+        """The hook is called with the layer every time the frames are decoded"""
+        self.load_hooks.append(hook)
+        if self.loaded:
+            hook(self.layer)
+
+    def __getattr__(self, name):
+        return getattr(self.load(), name)
+
+    def __setattr__(self, name, value):
+        self.assigned[name] = value
+        if self.layer is not None:
+            setattr(self.layer, name, value)
+
+
+def register_lazy_animations(animations, asset_list_path, dmd_path, cache, pack=None):
+    """Add a LazyAnimation for every entry of the LazyAnimations section, nothing is decoded yet.
+       The frames come from the asset pack when it holds an up to date copy."""
+    with open(asset_list_path) as f:
+        asset_list = yaml.safe_load(f)
+    for entry in asset_list.get('LazyAnimations') or []:
+        path = os.path.join(dmd_path, entry['file'])
+        animations[entry['key']] = LazyAnimation(entry, path, cache, animations['missing'], pack)
+
+
+def read_frames(path):
+    """Decode a .dmd file into (width, height, dots) tuples that a worker process can send back.
+       Return None when the file cannot be read."""
+    try:
+        frames = Animation().load(path).frames
+    except IOError:
+        return None
+    return [(frame.width, frame.height, frame.get_data()) for frame in frames]
+
+
+def frames_from_data(frame_data):
+    frames = []
+    for (width, height, data) in frame_data:
+        frame = Frame(width, height)
+        frame.set_data(data)
+        frames.append(frame)
+    return frames
+
+
+def preload_animations(animations, keys, progress=None, num_processes=0):
+    """Decode the given lazy animations during startup instead of the first time they are shown.
+       Decoding is CPU bound, the animations the asset pack does not hold are decoded by a pool of
+       num_processes worker processes, 0 or 1 decodes them one after the other in this process.
+       The layers are created, the errors are logged and the progress callback is called with
+       (num_loaded, num_keys, key) in this process, in the order of the keys whatever the timing of the workers."""
+    preloaded = [(key, animations[key]) for key in keys]
+    if num_processes <= 1:
+        for (index, (key, animation)) in enumerate(preloaded):
+            animation.load()
+            if progress:
+                progress(index + 1, len(preloaded), key)
+        return
+
+    packed = OrderedDict()
+    for (key, animation) in preloaded:
+        if not animation.loaded and animation.path not in packed:
+            packed[animation.path] = animation.packed_frames()
+    paths = [path for (path, frames) in packed.items() if frames is None]
+    pool = multiprocessing.Pool(min(num_processes, len(paths))) if paths else None
+    try:
+        # the results come back in the order of the paths, that is the order the loop below needs them
+        decoded = pool.imap(read_frames, paths) if pool else iter([])
+        results = {}
+        for (index, (key, animation)) in enumerate(preloaded):
+            if not animation.loaded:
+                frames = packed[animation.path]
+                if frames is None:
+                    if animation.path not in results:
+                        results[animation.path] = next(decoded)
+                    frame_data = results[animation.path]
+                    frames = frames_from_data(frame_data) if frame_data is not None else animation.missing_frames()
+                animation.load(frames)
+            if progress:
+                progress(index + 1, len(preloaded), key)
+    finally:
+        if pool:
+            pool.close()
+            pool.join()
@@ -0,0 +1,161 @@
+"""Pack file holding the decoded frames of the lazy animations and the compiled lampshows,
+so they are not decoded again on every boot.
+
+Build the pack from the game directory after changing the animations or the lampshows:
+    python assetcache.py
+
+The pack is one file: a header, the frame data of every animation and a JSON index at the end.
+Each entry is keyed by its source path and records the mtime, size and SHA-1 of the source.
+The compiled lampshows are small, they are kept in the index itself.
+An entry is used only when its source did not change, otherwise the game decodes the source.
+"""
+
+import hashlib
+import json
+import logging
+import mmap
+import multiprocessing
+import os
+import struct
+import yaml
+from procgame.dmd import Frame
+from animations import frames_from_data, read_frames
+from lampshows import CompiledLampShow
+
+# header: magic, format version, offset and length of the index
+HEADER = struct.Struct('<4sBQQ')
+MAGIC = b'JD2P'
+VERSION = 1
+
+
+def source_key(path):
+    return os.path.normpath(path).replace('\\', '/')
+
+
+def file_hash(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+class AssetPack(object):
+    """Read-only view of the pack file, the frame data is read from a memory map"""
+
+    logger = logging.getLogger('game.assetcache')
+
+    def __init__(self, path):
+        self.entries = {}
+        self.data = None
+        self.hits = 0
+        self.misses = 0
+        if not path or not os.path.exists(path):
+            return
+
+        with open(path, 'rb') as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, index_offset, index_length) = HEADER.unpack_from(self.data)
+        if magic != MAGIC or version != VERSION:
+            self.logger.error('Ignoring %s, it is not an asset pack of this version', path)
+            self.data = None
+            return
+        self.entries = json.loads(self.data[index_offset:index_offset + index_length].decode('utf-8'))
+
+    def frames(self, path):
+        """Return the decoded frames of the given source file, or None when the pack does not have them or they are stale"""
+        entry = self.fresh_entry(path, 'sizes')
+        if entry is None:
+            return None
+
+        frames = []
+        offset = entry['offset']
+        for (width, height) in entry['sizes']:
+            frame = Frame(width, height)
+            frame.set_data(self.data[offset:offset + width * height])
+            frames.append(frame)
+            offset += width * height
+        return frames
+
+    def lampshow(self, path):
+        """Return the compiled form of the given lampshow, see CompiledLampShow.to_data(), or None"""
+        entry = self.fresh_entry(path, 'lampshow')
+        return entry['lampshow'] if entry else None
+
+    def fresh_entry(self, path, kind):
+        entry = self.entries.get(source_key(path))
+        if entry is None or kind not in entry or not self.is_fresh(path, entry):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry
+
+    def is_fresh(self, path, entry):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return False
+        if stat.st_size != entry['size']:
+            return False
+        # a copy or a checkout changes the mtime without changing the content
+        return int(stat.st_mtime) == entry['mtime'] or file_hash(path) == entry['sha1']
+
+
+def source_entry(source_path):
+    stat = os.stat(source_path)
+    return {'mtime': int(stat.st_mtime), 'size': stat.st_size, 'sha1': file_hash(source_path)}
+
+
+def write_pack(path, animations, lampshows=None):
+    """Write a pack of the given {source path: frames} and {source path: CompiledLampShow} dictionaries"""
+    entries = {}
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, 0, 0))
+        for (source_path, frames) in sorted(animations.items()):
+            entry = entries[source_key(source_path)] = source_entry(source_path)
+            entry.update(offset=f.tell(), sizes=[(frame.width, frame.height) for frame in frames])
+            for frame in frames:
+                f.write(frame.get_data())
+        for (source_path, show) in sorted((lampshows or {}).items()):
+            entry = entries[source_key(source_path)] = source_entry(source_path)
+            entry['lampshow'] = show.to_data()
+
+        index = json.dumps(entries, sort_keys=True).encode('utf-8')
+        index_offset = f.tell()
+        f.write(index)
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, VERSION, index_offset, len(index)))
+    # replace the previous pack only once the new one is complete
+    if os.path.exists(path):
+        os.remove(path)
+    os.rename(tmp_path, path)
+
+
+def build(config_path='config/config.yaml', asset_list_path='config/asset_list.yaml'):
+    with open(config_path) as f:
+        game_config = yaml.safe_load(f)
+    with open(asset_list_path) as f:
+        asset_list = yaml.safe_load(f)
+
+    # decoding is CPU bound, the animations are decoded by a process per core
+    paths = [os.path.join(game_config['dmd_path'], entry['file']) for entry in asset_list.get('LazyAnimations') or []]
+    pool = multiprocessing.Pool()
+    try:
+        decoded = pool.map(read_frames, paths)
+    finally:
+        pool.close()
+        pool.join()
+    animations = {}
+    for (path, frame_data) in zip(paths, decoded):
+        # the first animation that cannot be read in asset list order is reported, whatever the timing of the workers
+        if frame_data is None:
+            raise IOError('Cannot load animation from %s' % path)
+        animations[path] = frames_from_data(frame_data)
+
+    lampshow_path = game_config.get('lampshow_path', './assets/lampshows/')
+    paths = [os.path.join(lampshow_path, entry['file']) for entry in asset_list.get('LampShows') or []]
+    lampshows = dict((path, CompiledLampShow.compile(path)) for path in paths)
+    write_pack(game_config['asset_pack_path'], animations, lampshows)
+    print('%d animations and %d lampshows written to %s' % (len(animations), len(lampshows), game_config['asset_pack_path']))
+
+
+if __name__ == '__main__':
+    build()
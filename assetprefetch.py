@@ -0,0 +1,104 @@
+"""Read the asset files listed in asset_list.yaml on worker threads during startup.
+
+The asset manager of the framework loads the fonts, lampshows, animations and sounds one after the other
+and draws the UserInterface progress bar while it does. The game cannot change that loader, the prefetch
+reads the same files ahead of it on a few threads so the loader finds them in the cache of the OS
+and waits less for the disk. The threads only read, reading a file releases the GIL.
+The loader still loads every asset itself: the asset dictionaries, the progress bar and the 'missing'
+fallback are unchanged. A file the prefetch cannot read is left to the loader to report.
+"""
+
+import logging
+from multiprocessing.pool import ThreadPool
+import os
+import yaml
+
+CHUNK_SIZE = 1 << 20
+
+
+def read_file(path):
+    """Read the whole file and return the number of bytes read, 0 when it cannot be read"""
+    num_bytes = 0
+    try:
+        with open(path, 'rb') as f:
+            chunk = f.read(CHUNK_SIZE)
+            while chunk:
+                num_bytes += len(chunk)
+                chunk = f.read(CHUNK_SIZE)
+    except (IOError, OSError):
+        pass
+    return num_bytes
+
+
+def find_file(directories, name):
+    # the fonts are searched in a list of directories
+    for directory in directories:
+        path = os.path.join(directory, name)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def asset_paths(game_config, asset_list):
+    """The files of asset_list.yaml loaded by the framework, the sounds last since they are the largest"""
+    paths = []
+    dmd_path = game_config.get('dmd_path', '')
+    paths += [os.path.join(dmd_path, entry['file']) for entry in asset_list.get('Animations') or []]
+
+    fonts = asset_list.get('Fonts') or {}
+    font_path = game_config.get('font_path') or []
+    if not isinstance(font_path, list):
+        font_path = [font_path]
+    paths += [find_file(font_path, entry['file']) for entry in fonts.get('DMDFonts') or []]
+    paths += [os.path.join(game_config.get('hdfont_path', ''), entry['file']) for entry in fonts.get('HDFonts') or []]
+
+    lampshow_path = game_config.get('lampshow_path', './assets/lampshows/')
+    paths += [os.path.join(lampshow_path, entry['file']) for entry in asset_list.get('LampShows') or []]
+
+    audio = asset_list.get('Audio') or {}
+    sound_path = game_config.get('sound_path', '')
+    for (section, directory_key) in [('Music', 'music_dir'), ('Effects', 'sfx_dir'), ('Voice', 'voice_dir')]:
+        directory = os.path.join(sound_path, game_config.get(directory_key, ''))
+        paths += [os.path.join(directory, entry['file']) for entry in audio.get(section) or []]
+
+    # a file listed under several keys is read once
+    unique_paths = []
+    for path in paths:
+        if path is not None and path not in unique_paths:
+            unique_paths.append(path)
+    return unique_paths
+
+
+class AssetPrefetch(object):
+    """Reads the asset files on a pool of threads from construction until finish() is called"""
+
+    logger = logging.getLogger('game.assetprefetch')
+
+    def __init__(self, paths, num_threads=4):
+        self.paths = paths
+        self.pool = None
+        self.result = None
+        if paths and num_threads > 0:
+            self.pool = ThreadPool(min(num_threads, len(paths)))
+            self.result = self.pool.map_async(read_file, paths)
+
+    @classmethod
+    def from_config(cls, config_path='config/config.yaml', asset_list_path='config/asset_list.yaml', num_threads=4):
+        if num_threads <= 0:
+            return cls([], 0)
+        with open(config_path) as f:
+            game_config = yaml.safe_load(f)
+        with open(asset_list_path) as f:
+            asset_list = yaml.safe_load(f)
+        return cls(asset_paths(game_config, asset_list), num_threads)
+
+    def finish(self):
+        """Wait for the reads still running and return the number of bytes read"""
+        if self.pool is None:
+            return 0
+        self.pool.close()
+        self.pool.join()
+        num_bytes = sum(self.result.get())
+        self.logger.info('Read %d asset files, %d bytes', len(self.paths), num_bytes)
+        self.pool = None
+        return num_bytes
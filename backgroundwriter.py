@@ -0,0 +1,82 @@
+from collections import OrderedDict
+import logging
+import threading
+import timeit
+from tickprofile import LatencyHistogram
+
+class BackgroundWriter(object):
+    """Runs the file writes of the game in a worker thread so they do not block the run loop.
+       A write is a function of a snapshot owned by the worker, the game thread must not modify it.
+       A write waiting in the queue is replaced by a newer write with the same key."""
+
+    logger = logging.getLogger('game.writer')
+
+    def __init__(self):
+        self.clock = timeit.default_timer
+        self.condition = threading.Condition()
+        self.pending = OrderedDict()
+        self.writing = False
+        self.closed = False
+        self.histogram = LatencyHistogram(unit='writes')
+        self.num_coalesced = 0
+        self.max_depth = 0
+        self.thread = threading.Thread(target=self.run, name='BackgroundWriter')
+        self.thread.daemon = True
+        self.thread.start()
+
+    def submit(self, key, write, *args):
+        with self.condition:
+            if key in self.pending:
+                # the newer snapshot replaces the older one and runs after the writes queued in between
+                del self.pending[key]
+                self.num_coalesced += 1
+            self.pending[key] = (write, args)
+            self.max_depth = max(self.max_depth, len(self.pending))
+            self.condition.notify_all()
+
+    def depth(self):
+        with self.condition:
+            return len(self.pending) + (1 if self.writing else 0)
+
+    def flush(self, timeout=None):
+        """Wait until the writes submitted so far are done, return False after the timeout"""
+        deadline = None if timeout is None else self.clock() + timeout
+        with self.condition:
+            while self.pending or self.writing:
+                remaining = None if deadline is None else deadline - self.clock()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self.condition.wait(remaining)
+        return True
+
+    def close(self):
+        self.flush()
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+        self.thread.join()
+        self.logger.info('background writes: %s', self.summary())
+
+    def run(self):
+        while True:
+            with self.condition:
+                while not self.pending and not self.closed:
+                    self.condition.wait()
+                if not self.pending:
+                    return
+                (key, (write, args)) = self.pending.popitem(last=False)
+                self.writing = True
+
+            start = self.clock()
+            try:
+                write(*args)
+            except Exception:
+                self.logger.exception('Writing %s failed', key)
+            self.histogram.record(self.clock() - start)
+
+            with self.condition:
+                self.writing = False
+                self.condition.notify_all()
+
+    def summary(self):
+        return '%s, max queue depth %d, %d coalesced' % (self.histogram.summary(), self.max_depth, self.num_coalesced)
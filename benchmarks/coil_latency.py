@@ -0,0 +1,141 @@
+"""Measure the delay between a switch event and the coil command reacting to it.
+
+The game runs headless on the fake P-ROC with 1ms ticks. For each scenario, the delay is measured
+in game time, in ticks and in wall-clock time spent running those ticks, and written to a JSON report.
+
+Run from the game directory: python -m benchmarks.coil_latency [--output benchmarks/coil_latency.json]
+"""
+
+import argparse
+import json
+import os
+import platform
+from jd2sim import SimulatedGame, Simulator, clock
+
+TICK_SECONDS = 0.001
+
+# the report is written next to the benchmark by default, it is not part of the repository
+DEFAULT_OUTPUT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'coil_latency.json')
+
+
+class CoilProbe(object):
+    """Stands in for the player of the simulator and remembers the coil commands"""
+
+    def __init__(self):
+        self.commands = []
+
+    def coil_changed(self, name, state):
+        self.commands.append((name, state))
+
+
+class Bench(object):
+
+    def __init__(self, repeat):
+        self.repeat = repeat
+        self.game = SimulatedGame(random_seed=0)
+        self.sim = Simulator(self.game, clock, TICK_SECONDS)
+        self.probe = CoilProbe()
+        self.sim.player = self.probe
+        self.results = []
+
+    def run_for(self, seconds):
+        end = clock.now + seconds
+        while clock.now < end:
+            self.sim.step()
+
+    def wait_for_coil(self, coil, states, timeout=10):
+        """Run until the coil receives one of the given commands, return the delay or None after the timeout"""
+        del self.probe.commands[:]
+        (start_time, start_ticks, start_wall) = (clock.now, self.sim.num_ticks, self.sim.tick_seconds_total)
+        while clock.now < start_time + timeout:
+            self.sim.step()
+            if any(name == coil and state in states for (name, state) in self.probe.commands):
+                return (clock.now - start_time, self.sim.num_ticks - start_ticks, self.sim.tick_seconds_total - start_wall)
+        return None
+
+    def measure(self, scenario, state, switch, coil, trigger, states=('pulse',), cleanup=None, busy=False):
+        samples = []
+        for unused in range(self.repeat):
+            if busy:
+                # lots of switch activity while waiting for the coil
+                for index in range(100):
+                    self.sim.after(0.05 * index, self.sim.pulse_switch, 'slingL' if index % 2 else 'slingR')
+            trigger()
+            samples.append(self.wait_for_coil(coil, states))
+            if cleanup:
+                cleanup()
+            self.run_for(3)
+
+        measured = [sample for sample in samples if sample]
+        result = {'scenario': scenario, 'state': state, 'switch': switch, 'coil': coil,
+                  'samples': len(samples), 'timeouts': len(samples) - len(measured)}
+        for (index, key) in enumerate(['game_ms', 'ticks', 'wall_ms']):
+            values = [sample[index] * (1 if key == 'ticks' else 1000) for sample in measured]
+            if values:
+                result[key] = {'mean': sum(values) / len(values), 'min': min(values), 'max': max(values)}
+        self.results.append(result)
+        print('%-32s %-20s %8s game ms %8s ticks %8s wall ms%s' % (scenario, state,
+            '%.1f' % result['game_ms']['mean'] if measured else '-',
+            '%.0f' % result['ticks']['mean'] if measured else '-',
+            '%.2f' % result['wall_ms']['mean'] if measured else '-',
+            ', %d timeouts' % result['timeouts'] if result['timeouts'] else ''))
+
+    def run(self):
+        sim = self.sim
+        for switch in self.game.switches:
+            sim.set_switch(switch.name, switch.name in ['alwaysClosed', 'coinDoor'] or switch.name.startswith('trough'))
+        self.run_for(5)
+
+        # attract mode
+        self.measure('StallSearch.pop_coil', 'attract', 'shooterL', 'shooterL',
+            lambda: sim.set_switch('shooterL', True), cleanup=lambda: sim.set_switch('shooterL', False))
+        self.measure('Deadworld.sw_magnetOverRing_open', 'attract', 'magnetOverRing', 'craneMagnet',
+            self.magnet_over_ring, states=('on',))
+
+        # start a game, the player presses the fire button as soon as the ball reaches the shooter lane
+        sim.pulse_switch('startButton', 0.1)
+        if self.wait_for_coil('trough', ('pulse',)) is None:
+            raise Exception('the game did not start')
+        sim.set_switch('trough6', False)
+        self.measure('BasePlay.safe_plunge', 'ball starting', 'fireR', 'shooterR', self.serve_and_plunge,
+            cleanup=lambda: sim.set_switch('shooterR', False))
+
+        for (state, busy) in [('ball in play', False), ('ball in play, busy', True)]:
+            self.measure('BasePlay.flash_then_pop', state, 'popperL', 'popperL',
+                lambda: self.hit_and_hold('popperL'), cleanup=lambda: sim.set_switch('popperL', False), busy=busy)
+            self.measure('BasePlay.shooterL_variable_pulse', state, 'shooterL', 'shooterL',
+                lambda: self.hit_and_hold('shooterL'), cleanup=lambda: sim.set_switch('shooterL', False), busy=busy)
+
+    def magnet_over_ring(self):
+        # the planet searches for balls, the crane passes over the ring
+        self.game.deadworld.perform_ball_search()
+        self.sim.set_switch('magnetOverRing', True)
+        self.run_for(0.1)
+        self.sim.set_switch('magnetOverRing', False)
+
+    def serve_and_plunge(self):
+        self.game.base_play.ball_starting = True
+        self.sim.set_switch('shooterR', True)
+        self.sim.pulse_switch('fireR', 0.1)
+
+    def hit_and_hold(self, switch):
+        # a switch hit keeps the ball search away
+        self.sim.pulse_switch('slingL')
+        self.sim.set_switch(switch, True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure the delay between a switch event and the coil reacting to it')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help='path of the JSON report')
+    parser.add_argument('--repeat', type=int, default=5, help='number of samples per scenario')
+    args = parser.parse_args()
+
+    bench = Bench(args.repeat)
+    bench.run()
+    report = {'python': platform.python_version(), 'tick_ms': 1000 * TICK_SECONDS, 'results': bench.results}
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
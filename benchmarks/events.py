@@ -0,0 +1,70 @@
+"""Compare the cost of JD2Game.send_event with and without the EventRegistry.
+
+Run from the game directory: python -m benchmarks.events
+"""
+
+import timeit
+from eventregistry import EventRegistry
+
+
+class StubMode(object):
+    """A started mode, some modes handle the benchmarked event"""
+
+    def __init__(self, priority, handles_event):
+        self.priority = priority
+        if handles_event:
+            self.event_shooterL_active_500ms = self.handler
+
+    def is_started(self):
+        return True
+
+    def handler(self):
+        return False
+
+
+class StubModeQueue(object):
+    """The part of the framework ModeQueue used by send_event, modes are kept in decreasing priority"""
+
+    def __init__(self):
+        self.modes = []
+
+    def __getitem__(self, index):
+        return self.modes[index]
+
+    def add(self, mode):
+        self.modes.append(mode)
+        self.modes.sort(key=lambda m: -m.priority)
+
+    def remove(self, mode):
+        self.modes.remove(mode)
+
+
+def send_event_by_lookup(modes, event):
+    # JD2Game.send_event before the EventRegistry
+    for mode in modes[:]:
+        if mode.is_started():
+            handler = getattr(mode, event, None)
+            if handler:
+                ret = handler()
+                if ret:
+                    return ret
+
+
+def main():
+    event = 'event_shooterL_active_500ms'
+    number = 100000
+    for num_modes in [10, 30, 60]:
+        queue = StubModeQueue()
+        registry = EventRegistry(queue)
+        for priority in range(num_modes):
+            # like the game, only a few modes handle any given event
+            queue.add(StubMode(priority, handles_event=priority % 10 == 0))
+
+        lookup = timeit.timeit(lambda: send_event_by_lookup(queue, event), number=number)
+        table = timeit.timeit(lambda: registry.send_event(event), number=number)
+        print('%2d modes: lookup %6.2f us/event, registry %6.2f us/event, %4.1fx faster' %
+              (num_modes, 1e6 * lookup / number, 1e6 * table / number, lookup / table))
+
+
+if __name__ == '__main__':
+    main()
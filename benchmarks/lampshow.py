@@ -0,0 +1,94 @@
+"""Count the driver commands sent to the P-ROC while the attract mode loops its lampshows.
+
+The game runs headless on the fake P-ROC, see jd2sim.py, once with the lamp controller of the framework
+and once with CompiledShowPlayer, see lampshows.py. Every driver command the fake P-ROC receives is counted,
+the other lamps of the attract mode send the same commands in both runs.
+The attract mode switches between attract0 and attract1 every 10 seconds and repeats the show meanwhile.
+
+Run from the game directory: python -m benchmarks.lampshow [--seconds 600]
+"""
+
+import argparse
+import timeit
+from jd2sim import SimulatedGame, Simulator, clock
+from lampshows import load_lampshows
+from my_modes.showplayer import CompiledShowPlayer
+
+TICK_SECONDS = 0.001
+
+
+def count_driver_commands(proc):
+    """Count the calls of the driver commands of the P-ROC, the state queries are not commands"""
+    counts = {}
+
+    def count(name):
+        send = getattr(proc, name)
+        def command(*args, **kwargs):
+            counts[name] += 1
+            return send(*args, **kwargs)
+        counts[name] = 0
+        setattr(proc, name, command)
+
+    for name in dir(proc):
+        if name.startswith('driver_') and name != 'driver_get_state' and callable(getattr(proc, name)):
+            count(name)
+    return counts
+
+
+def use_lamp_controller(game, shows):
+    """Play the lampshows with the framework controller when shows is None, with CompiledShowPlayer otherwise"""
+    lampctrl = game.lampctrl
+    if isinstance(lampctrl, CompiledShowPlayer):
+        lampctrl.stop_show()
+        game.modes.remove(lampctrl)
+        lampctrl = lampctrl.lamp_controller
+    if shows is not None:
+        # same as compiled_lampshows: True in config.yaml
+        lampctrl = CompiledShowPlayer(game, 5, shows, lampctrl)
+        game.modes.add(lampctrl)
+    game.lampctrl = lampctrl
+
+
+def run(shows, seconds):
+    game = SimulatedGame(random_seed=0)
+    sim = Simulator(game, clock, TICK_SECONDS)
+    use_lamp_controller(game, shows)
+    # both runs play the same sequence of shows
+    game.attract_mode.lampshow_random.seed(0)
+    for switch in game.switches:
+        sim.set_switch(switch.name, switch.name in ['alwaysClosed', 'coinDoor'] or switch.name.startswith('trough'))
+    # the attract mode starts its shows when the game is reset
+    game.reset()
+    sim.step()
+
+    counts = count_driver_commands(game.proc)
+    end = clock.now + seconds
+    while clock.now < end:
+        sim.step()
+    game.lampctrl.stop_show()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Count the commands sent to the P-ROC while the attract lampshows loop')
+    parser.add_argument('--seconds', type=int, default=600, help='duration of the attract mode')
+    args = parser.parse_args()
+
+    start = timeit.default_timer()
+    shows = load_lampshows('config/asset_list.yaml', './assets/lampshows/')
+    compile_ms = 1000 * (timeit.default_timer() - start)
+
+    print('%-14s %8s %8s %8s' % ('show', 'seconds', 'tracks', 'runs'))
+    for (key, show) in sorted(shows.items()):
+        print('%-14s %8d %8d %8d' % (key, show.num_seconds, len(show.tracks), sum(len(runs) for (kind, name, runs) in show.tracks)))
+    print('compiled %d shows in %.1f ms' % (len(shows), compile_ms))
+
+    for (name, run_shows) in [('framework', None), ('compiled', shows)]:
+        counts = run(run_shows, args.seconds)
+        total = sum(counts.values())
+        details = ', '.join('%s %d' % (command, count) for (command, count) in sorted(counts.items()) if count)
+        print('%-10s %8d commands %8.1f commands per second (%s)' % (name, total, float(total) / args.seconds, details))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""Compare decoding the lazy animations one after the other with decoding them in worker processes,
+and reading the asset files one after the other with reading them on threads.
+
+The OS cache makes the second read of a file cheap: only the first read of the files measures the disk,
+run it after a reboot and again after the next reboot with --threads-first.
+
+Run from the game directory: python -m benchmarks.preload [--processes 2] [--threads 4] [--threads-first]
+"""
+
+import argparse
+import os
+import timeit
+import yaml
+from animations import AnimationCache, LazyAnimation, preload_animations
+from assetprefetch import AssetPrefetch, asset_paths, read_file
+
+
+class MissingAnimation(object):
+    frames = []
+
+
+def lazy_animations(game_config, asset_list):
+    cache = AnimationCache()
+    animations = {}
+    for entry in asset_list.get('LazyAnimations') or []:
+        path = os.path.join(game_config['dmd_path'], entry['file'])
+        animations[entry['key']] = LazyAnimation(entry, path, cache, MissingAnimation())
+    return animations
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure the concurrent asset loading')
+    parser.add_argument('--processes', type=int, default=2, help='worker processes decoding the animations')
+    parser.add_argument('--threads', type=int, default=4, help='threads reading the asset files')
+    parser.add_argument('--threads-first', action='store_true', help='read the files on threads before reading them serially')
+    args = parser.parse_args()
+
+    with open('config/config.yaml') as f:
+        game_config = yaml.safe_load(f)
+    with open('config/asset_list.yaml') as f:
+        asset_list = yaml.safe_load(f)
+
+    keys = [entry['key'] for entry in asset_list.get('LazyAnimations') or []]
+    for (name, num_processes) in [('serial', 0), ('%d processes' % args.processes, args.processes)]:
+        animations = lazy_animations(game_config, asset_list)
+        start = timeit.default_timer()
+        preload_animations(animations, keys, num_processes=num_processes)
+        print('decode %d animations %-12s %8.1f ms' % (len(keys), name, 1000 * (timeit.default_timer() - start)))
+
+    paths = asset_paths(game_config, asset_list)
+    reads = [('serial', lambda: sum(read_file(path) for path in paths)),
+             ('%d threads' % args.threads, lambda: AssetPrefetch(paths, args.threads).finish())]
+    for (name, read) in reads[::-1] if args.threads_first else reads:
+        start = timeit.default_timer()
+        num_bytes = read()
+        print('read %d files (%d bytes) %-12s %8.1f ms' % (len(paths), num_bytes, name, 1000 * (timeit.default_timer() - start)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""Measure the frames allocated per tick by the status message transitions.
+
+Run from the game directory: python -m benchmarks.transitions
+"""
+
+import timeit
+from procgame.dmd import Frame
+import layers
+from layers import DontMoveTransition, GroupedTransition, SlideTransition
+
+
+class CountingFrame(Frame):
+    """A Frame that counts how many times it was instantiated"""
+    count = 0
+
+    def __init__(self, *args, **kwargs):
+        super(CountingFrame, self).__init__(*args, **kwargs)
+        CountingFrame.count += 1
+
+
+class AllocatingSlideTransition(SlideTransition):
+    """The SlideTransition as it was before it reused its scratch frames"""
+
+    def next_frame(self, from_frame, to_frame):
+        blank_frame = layers.Frame(to_frame.width, to_frame.height)
+        return super(SlideTransition, self).next_frame(blank_frame, to_frame)
+
+    def transition_frame(self, from_frame, to_frame):
+        frame = layers.Frame(width=to_frame.width, height=to_frame.height)
+        prog = -self.progress if self.in_out == 'out' else 1.0 - self.progress
+        dst_x = prog * frame.width
+        layers.Frame.copy_rect(dst=frame, dst_x=dst_x, dst_y=0, src=to_frame, src_x=0, src_y=0, width=frame.width, height=frame.height, op='copy')
+        return frame
+
+
+def message_transition(slide_class):
+    # same transitions as JD2Game.create_message_layer()
+    slide_in = slide_class(direction='west')
+    dont_move = DontMoveTransition()
+    dont_move.progress_per_frame = 1.0 / 120.0
+    slide_out = slide_class(direction='west')
+    slide_out.in_out = 'out'
+    return GroupedTransition([slide_in, dont_move, slide_out])
+
+
+def run(slide_class, width, height, num_messages=100):
+    to_frame = Frame(width, height)
+    transition = message_transition(slide_class)
+    done = []
+    transition.completed_handler = lambda: done.append(True)
+
+    CountingFrame.count = 0
+    num_frames = 0
+    start = timeit.default_timer()
+    for unused in range(num_messages):
+        del done[:]
+        transition.start()
+        while not done:
+            transition.next_frame(None, to_frame)
+            num_frames += 1
+    elapsed = timeit.default_timer() - start
+    return float(CountingFrame.count) / num_frames, 1e6 * elapsed / num_frames
+
+
+def main():
+    saved_frame = layers.Frame
+    layers.Frame = CountingFrame
+    try:
+        for (width, height) in [(128, 7), (128, 32)]:
+            for (name, slide_class) in [('before', AllocatingSlideTransition), ('after', SlideTransition)]:
+                allocs, usecs = run(slide_class, width, height)
+                print('%3dx%-3d %-6s %6.3f frames allocated/tick %8.2f us/tick' % (width, height, name, allocs, usecs))
+    finally:
+        layers.Frame = saved_frame
+
+
+if __name__ == '__main__':
+    main()
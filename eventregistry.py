@@ -0,0 +1,53 @@
+class EventRegistry(object):
+    """For each event name, the priority ordered list of the modes handling that event and their bound handler.
+       The lists are built on first use and discarded whenever a mode is added or removed."""
+
+    def __init__(self, mode_queue):
+        self.mode_queue = mode_queue
+        self.handlers = {}
+        self.modes = mode_queue.modes
+
+        # discard the lists when the mode queue changes,
+        # before the change for the events sent by mode_started() and mode_stopped(), and after the change
+        add, remove = mode_queue.add, mode_queue.remove
+        def add_modes(mode):
+            self.invalidate()
+            try:
+                return add(mode)
+            finally:
+                self.invalidate()
+        def remove_modes(mode):
+            self.invalidate()
+            try:
+                return remove(mode)
+            finally:
+                self.invalidate()
+        mode_queue.add = add_modes
+        mode_queue.remove = remove_modes
+
+    def invalidate(self):
+        self.handlers = {}
+        self.modes = self.mode_queue.modes
+
+    def handlers_for(self, event):
+        # the framework sometimes replaces the list of modes rather than calling remove()
+        if self.mode_queue.modes is not self.modes:
+            self.invalidate()
+        handlers = self.handlers.get(event)
+        if handlers is None:
+            handlers = []
+            for mode in self.mode_queue.modes:
+                handler = getattr(mode, event, None)
+                if handler:
+                    handlers.append((mode, handler))
+            self.handlers[event] = handlers
+        return handlers
+
+    def send_event(self, event):
+        """Call the handler of every started mode in priority order until one returns a true value"""
+        for (mode, handler) in self.handlers_for(event):
+            if mode.is_started():
+                ret = handler()
+                if ret:
+                    # skip lower priority modes
+                    return ret
@@ -0,0 +1,141 @@
+"""Append-only journal of the game data, the audits and the high scores.
+
+Saving the game data appends the sections that changed since the previous save to the journal,
+one JSON line per section holding the whole section, with a single fsync for the save.
+The journal is compacted into the YAML file when the game is idle: the YAML file is replaced
+atomically, then the journal is emptied. At startup, the journal is replayed on top of the YAML file.
+A record cut by a power loss is the last line of the journal, it is ignored.
+A section holding a value that would not come back from JSON with the same type is not journaled,
+the whole YAML file is rewritten instead.
+"""
+
+from collections import OrderedDict
+import json
+import logging
+import os
+import platform
+import yaml
+
+TEXT_TYPES = (type(u''), type(''))
+# int and long under Python 2
+INTEGER_TYPES = (int, type(2**64))
+
+
+class GameDataDumper(yaml.Dumper):
+    """Writes the OrderedDict as a mapping like jd2.py does, and the unicode strings read back from JSON
+       under Python 2 as plain strings instead of !!python/unicode"""
+    pass
+
+GameDataDumper.add_representer(OrderedDict, lambda dumper, data: dumper.represent_dict(data.items()))
+GameDataDumper.add_representer(type(u''), getattr(yaml.representer.SafeRepresenter, 'represent_unicode',
+                                                  yaml.representer.SafeRepresenter.represent_str))
+
+
+def replace_yaml_file(path, data):
+    """Write the data to a temporary file and rename it over the YAML file once it is on disk"""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        yaml.dump(data, f, Dumper=GameDataDumper)
+        f.flush()
+        os.fsync(f.fileno())
+    if platform.system() == 'Windows' and os.path.exists(path):
+        # rename does not replace an existing file on Windows
+        os.remove(path)
+    os.rename(tmp_path, path)
+
+
+def check_json_value(value, path):
+    """Raise TypeError for a value that would not come back from JSON with the same type"""
+    if isinstance(value, dict):
+        for (key, item) in value.items():
+            if not isinstance(key, TEXT_TYPES):
+                raise TypeError('%s: the key %r is not a string' % (path, key))
+            check_json_value(item, path + '/' + key)
+    elif isinstance(value, list):
+        for (index, item) in enumerate(value):
+            check_json_value(item, '%s[%d]' % (path, index))
+    elif value is not None and not isinstance(value, TEXT_TYPES + INTEGER_TYPES + (float,)):
+        raise TypeError('%s: %r cannot be saved in the journal' % (path, value))
+
+
+class GameDataJournal(object):
+
+    logger = logging.getLogger('game.gamedata')
+
+    def __init__(self, path):
+        self.path = path
+        # the last saved JSON of every section
+        self.saved = {}
+        self.num_records = 0
+        self.num_appends = 0
+        self.num_compactions = 0
+
+    def replay(self, game_data):
+        """Apply the journal to the game data loaded from the YAML file"""
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                for line in f:
+                    try:
+                        record = json.loads(line, object_pairs_hook=OrderedDict)
+                    except ValueError:
+                        self.logger.warning('Ignoring the incomplete record at the end of %s', self.path)
+                        break
+                    game_data[record['key']] = record['value']
+                    self.num_records += 1
+        self.remember(game_data)
+
+    def remember(self, game_data):
+        self.saved = {}
+        for (key, value) in game_data.items():
+            try:
+                self.saved[key] = self.serialize(key, value)
+            except TypeError:
+                # the section is not journaled, the next save rewrites the YAML file
+                pass
+
+    def serialize(self, key, value):
+        check_json_value(value, key)
+        return json.dumps(value, sort_keys=True)
+
+    def save(self, game_data, yaml_path):
+        """Append the sections changed since the last save, rewrite the YAML file when a section cannot be journaled"""
+        try:
+            self.append(game_data)
+        except TypeError:
+            self.logger.exception('Cannot journal the game data, rewriting %s', yaml_path)
+            self.compact(game_data, yaml_path, force=True)
+
+    def append(self, game_data):
+        """Append the sections changed since the last call.
+           Raise TypeError without writing anything when a section holds a value JSON cannot hold."""
+        changed = []
+        for (key, value) in game_data.items():
+            serialized = self.serialize(key, value)
+            if self.saved.get(key) != serialized:
+                changed.append((key, value, serialized))
+        if not changed:
+            return
+
+        with open(self.path, 'a') as f:
+            f.write(''.join(json.dumps({'key': key, 'value': value}) + '\n' for (key, value, serialized) in changed))
+            f.flush()
+            os.fsync(f.fileno())
+        # the sections are saved once they are on disk, a failed write is tried again on the next save
+        for (key, value, serialized) in changed:
+            self.saved[key] = serialized
+        self.num_records += len(changed)
+        self.num_appends += 1
+
+    def compact(self, game_data, yaml_path, force=False):
+        """Write the whole game data to the YAML file and empty the journal"""
+        if not self.num_records and not force:
+            return
+
+        replace_yaml_file(yaml_path, game_data)
+
+        # replaying the journal again after a power loss here is harmless, the records hold whole sections
+        with open(self.path, 'w') as f:
+            os.fsync(f.fileno())
+        self.remember(game_data)
+        self.num_records = 0
+        self.num_compactions += 1
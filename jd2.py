@@ -1,25 +1,48 @@
 from collections import OrderedDict
+import copy
 import logging
 from math import ceil
 import os
+import pinproc
 import platform
+import random
+import sys
+import time
 import yaml
-from procgame.dmd import font_named, FrameLayer
-from procgame.game import SkeletonGame
+from procgame import config
+from procgame.dmd import font_named, Frame, FrameLayer
+from procgame.game import Mode, SkeletonGame
 from procgame.game.skeletongame import run_proc_game
 from procgame.highscore import HighScoreCategory, get_highscore_data
 from procgame.modes.service import ServiceMode
-from layers import DontMoveTransition, FixedSizeTextLayer, GroupedTransition, SlideTransition
+from animations import AnimationCache, preload_animations, register_lazy_animations
+from assetcache import AssetPack
+from assetprefetch import AssetPrefetch
+from backgroundwriter import BackgroundWriter
+from eventregistry import EventRegistry
+from gamedatajournal import GameDataJournal, replace_yaml_file
+from lampshadow import LampShadow
+from lampshows import load_lampshows
+from playerstate import JDPlayer
+from settingssnapshot import create_settings_snapshot
+from startupprofile import StartupTimeline
+from switchtrace import SwitchRecorder
+from tickprofile import TickProfiler
+from layers import DontMoveTransition, FixedSizeTextLayer, GroupedTransition, SlideTransition, TextFrameCache
 from my_modes.attract import Attract
 from my_modes.ballsearch import JDBallSearch
 from my_modes.base import Base
 from my_modes.baseplay import BasePlay
 from my_modes.deadworld import Deadworld, DeadworldTest
+from my_modes.showplayer import CompiledShowPlayer
 from my_modes.stallsearch import StallSearch
 from my_modes.initials import JDEntrySequenceManager
 from my_modes.switchmonitor import JDSwitchMonitor
 
 logging.basicConfig(level=logging.ERROR, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+# the game logs errors only, except the warnings of its diagnostics
+for logger_name in ['game.tickprofile', 'game.playerstate', 'game.settings']:
+    logging.getLogger(logger_name).setLevel(logging.WARNING)
 
 curr_file_path = os.path.dirname(os.path.abspath(__file__))
 
@@ -36,22 +59,97 @@ class JD2Game(SkeletonGame):
         'Replay': 'Replay'
     }
 
-    def __init__(self):
-        super(JD2Game, self).__init__('config/JD.yaml', curr_file_path)
-
+    # the framework may update the lamps before the shadow table is created
+    lamp_shadow = None
+
+    # number of update_lamps() requests waiting for the end of the tick
+    lamp_update_requests = 0
+
+    # the framework may tick before the profiler is created
+    tick_profiler = None
+
+    # the game data may be saved before the journal and the writer are created
+    game_data_journal = None
+    writer = None
+
+    # the rules read the settings snapshot during a ball, the reads of the raw settings are reported when checked
+    raw_user_settings = None
+    ball_in_play = False
+    raw_settings_check = False
+    raw_settings_readers = None
+    settings_logger = logging.getLogger('game.settings')
+
+    # the last frame the score display returned on the display cycle, and the scores it shows
+    score_frame = None
+    score_frame_scores = None
+
+    # P-ROC events written to the switch trace
+    traced_event_types = [pinproc.EventTypeSwitchClosedDebounced, pinproc.EventTypeSwitchOpenDebounced,
+                          pinproc.EventTypeSwitchClosedNondebounced, pinproc.EventTypeSwitchOpenNondebounced]
+
+    def __init__(self, random_seed=None):
+        # time the startup phases and the constructor of every mode until the first frame
+        profile = config.value_for_key_path(keypath='startup_profile', default=False) or \
+            config.value_for_key_path(keypath='startup_trace_path', default=None)
+        self.startup = StartupTimeline(enabled=bool(profile))
+        if self.startup.enabled:
+            self.startup.profile_constructors(Mode)
+        # the asset files are read on threads ahead of the asset loader of the framework, see assetprefetch.py
+        asset_prefetch = AssetPrefetch.from_config(os.path.join(curr_file_path, 'config/config.yaml'),
+                                                   os.path.join(curr_file_path, 'config/asset_list.yaml'),
+                                                   config.value_for_key_path(keypath='asset_prefetch_threads', default=0))
+        with self.startup.phase('SkeletonGame.__init__'):
+            super(JD2Game, self).__init__('config/JD.yaml', curr_file_path)
+        asset_prefetch.finish()
+
+        # report the reads of the raw settings during a ball, once per reader
+        self.raw_settings_check = config.value_for_key_path(keypath='raw_settings_check', default=False)
+        self.raw_settings_readers = set()
+
+        # the rules draw from their own random generator, a switch trace and the seed are enough to replay a session
+        self.random_seed = random.randrange(2**32) if random_seed is None else random_seed
+        self.random = random.Random(self.random_seed)
+        # the framework picks the sound variants with the random module, some rules are timed by the length of the voice
+        random.seed(self.random_seed)
+        self.switch_recorder = self.create_switch_recorder()
+
+        self.event_registry = EventRegistry(self.modes)
+        self.tick_profiler = self.create_tick_profiler()
+        self.game_data_compact_delay = config.value_for_key_path(keypath='game_data_compact_delay', default=30)
         self.reset_pending = False
         self.lamp_schedules = {'slow':0x00ff00ff, 'medium':0x0f0f0f0f, 'fast':0x55555555, 'on':0xffffffff, 'off':0x00000000}
+        self.lamp_shadow = LampShadow(self.lamps)
+        self.lamp_updates_coalesced = 0
+        self.total_lamp_updates_coalesced = 0
         self.flashers = [x for x in self.coils if x.name.startswith('flasher')]
 
         # shorten time to launch balls in multiball
         self.trough.inactive_shooter_time = 0.95
 
+        # the animations of the LazyAnimations section are decoded the first time they are used
+        # the frames decoded in a previous boot are read from the asset pack, see assetcache.py
+        self.animation_cache = AnimationCache(config.value_for_key_path(keypath='animation_cache_bytes', default=0))
+        self.asset_pack = AssetPack(config.value_for_key_path(keypath='asset_pack_path', default=None))
+        with self.startup.phase('register_lazy_animations'):
+            register_lazy_animations(self.animations, os.path.join(curr_file_path, 'config/asset_list.yaml'),
+                                     config.value_for_key_path(keypath='dmd_path'), self.animation_cache, self.asset_pack)
+
         # shorten Blackout animation by removing last few frames
-        self.animations['blackout'].frames = self.animations['blackout'].frames[:-2]
+        self.animations['blackout'].add_load_hook(lambda layer: setattr(layer, 'frames', layer.frames[:-2]))
+
+        with self.startup.phase('animation_preload'):
+            preload_animations(self.animations, config.value_for_key_path(keypath='animation_preload', default=None) or [],
+                               self.show_preload_progress, config.value_for_key_path(keypath='animation_preload_processes', default=0))
+
+        # status messages come back again and again, keep the rendered frames of the most recent ones
+        self.text_frame_cache = TextFrameCache(config.value_for_key_path(keypath='text_frame_cache_size', default=64))
 
         # a text layer for status messages, same size and location as the status line at the bottom of the score display
         self.dmd.message_layer = self.create_message_layer()
 
+        # a score snapshot takes over the frame the score display last returned instead of rendering again
+        self.keep_score_frames()
+
         # Create basic modes
         self.base = Base(self, 1)
         self.attract_mode = Attract(self, 2)
@@ -59,23 +157,46 @@ class JD2Game(SkeletonGame):
         self.deadworld = Deadworld(self, 20)
         self.stall_search = StallSearch(self, 99997)
 
+        # the compiled lampshows send a lamp schedule only when the pattern of the lamp changes
+        if config.value_for_key_path(keypath='compiled_lampshows', default=False):
+            with self.startup.phase('load_lampshows'):
+                shows = load_lampshows(os.path.join(curr_file_path, 'config/asset_list.yaml'),
+                                       config.value_for_key_path(keypath='lampshow_path', default='./assets/lampshows/'), self.asset_pack)
+            self.lampctrl = CompiledShowPlayer(self, 5, shows, self.lampctrl)
+
         # Service mode
         deadworld_test = DeadworldTest(self, 200, self.fonts['settings-font-small'])
         self.service_mode = ServiceMode(self, 99, self.fonts['settings-font-small'], extra_tests=[deadworld_test])
 
-        self.reset()
+        with self.startup.phase('reset'):
+            self.reset()
+        self.startup.restore_constructors()
+
+        # the startup ends with the first frame of the attract mode
+        if self.startup.enabled:
+            update_dmd = self.dmd.update
+            def first_update(*args, **kwargs):
+                frame = update_dmd(*args, **kwargs)
+                self.dmd.update = update_dmd
+                self.startup_completed()
+                return frame
+            self.dmd.update = first_update
 
     def reset(self):
         self.trough.num_balls_locked = self.deadworld.num_balls_locked;
 
         # Reset the entire game framework
         super(JD2Game, self).reset()
+        if self.lamp_shadow:
+            self.lamp_shadow.invalidate()
 
         # read settings
-        num_blocks_setting = int(self.user_settings['Gameplay']['Blocks for Ultimate Challenge'])
+        self.ball_in_play = False
+        self.settings_snapshot = create_settings_snapshot(self.user_settings, self.settings)
+        num_blocks_setting = self.settings_snapshot.gameplay.blocks_for_ultimate_challenge
         self.blocks_required = min(16, 4 * int(ceil(num_blocks_setting / 4))) # a multiple of 4 less than or equal to 16
-        self.deadworld_mod_installed = self.user_settings['Machine']['Deadworld Mod Installed']
-        self.shaker_mod_installed = self.user_settings['Machine']['Shaker Mod Installed']
+        self.deadworld_mod_installed = self.settings_snapshot.machine.deadworld_mod_installed
+        self.shaker_mod_installed = self.settings_snapshot.machine.shaker_mod_installed
 
         self.base_play.reset()
         self.start_attract_mode()
@@ -93,19 +214,155 @@ class JD2Game(SkeletonGame):
             return super(JD2Game, self).is_missing_balls()
 
     def tick(self):
+        if self.tick_profiler:
+            self.tick_profiler.tick()
+        if self.switch_recorder:
+            # the trace clock starts with the run loop
+            self.switch_recorder.start(time.time())
         super(JD2Game, self).tick()
         # it is safer to call reset here than within a mode called by the run loop 
         if self.reset_pending:
             self.reset_pending = False
+            if self.writer:
+                self.writer.flush()
             self.sound.fadeout_music()
             self.sound.stop_all()
             self.reset()
 
+        # recompute the lamps once for all the updates requested during this tick
+        if self.lamp_update_requests:
+            self.lamp_updates_coalesced = self.lamp_update_requests - 1
+            self.total_lamp_updates_coalesced += self.lamp_updates_coalesced
+            self.update_lamps(now=True)
+
+    def startup_completed(self):
+        self.startup.finish('first attract frame')
+        trace_path = config.value_for_key_path(keypath='startup_trace_path', default=None)
+        if trace_path:
+            self.startup.write_chrome_trace(trace_path)
+
+    def show_preload_progress(self, num_loaded, num_keys, key):
+        """Draw a progress bar on the DMD while the animations are decoded during startup"""
+        frame = Frame(128, 32)
+        font = font_named('Font07x5.dmd')
+        font.draw(frame, 'Loading', (128 - font.size('Loading')[0]) / 2, 8)
+        frame.fill_rect(14, 19, 100, 5, (255,255,255,255))
+        frame.fill_rect(15, 20, 98, 3, (0,0,0,255))
+        frame.fill_rect(15, 20, 98 * num_loaded / num_keys, 3, (255,255,255,255))
+        # there is no run loop yet, give the frame to the physical DMD and the desktop window directly
+        for handler in self.dmd.frame_handlers:
+            handler(frame)
+
+    def load_config(self, filename):
+        with self.startup.phase('load_config'):
+            super(JD2Game, self).load_config(filename)
+
     def load_settings_and_stats(self):
-        super(JD2Game, self).load_settings_and_stats()
-        self.create_high_score_categories()
-        for category in self.all_highscore_categories:
-            category.load_from_game(self)
+        with self.startup.phase('load_settings_and_stats'):
+            super(JD2Game, self).load_settings_and_stats()
+        with self.startup.phase('game data journal'):
+            self.game_data_journal = self.create_game_data_journal()
+        # the settings and the game data are saved in the background from now on
+        if config.value_for_key_path(keypath='background_writer', default=True):
+            self.writer = BackgroundWriter()
+        with self.startup.phase('high scores'):
+            self.create_high_score_categories()
+            for category in self.all_highscore_categories:
+                category.load_from_game(self)
+        # the modes may read the settings when they are created, the snapshot is created again in reset()
+        self.settings_snapshot = create_settings_snapshot(self.user_settings, self.settings)
+
+    def create_game_data_journal(self):
+        path = config.value_for_key_path(keypath='game_data_journal_path', default=None)
+        if not path:
+            return None
+
+        # recover the saves since the last compaction
+        journal = GameDataJournal(path)
+        journal.replay(self.game_data)
+        journal.compact(self.game_data, self.game_data_path)
+        return journal
+
+    def save_game_data(self, *args, **kwargs):
+        # the YAML file is rewritten only when compacting the journal, see compact_game_data()
+        if self.game_data_journal:
+            self.write('game_data', self.game_data_journal.save, copy.deepcopy(self.game_data), self.game_data_path)
+        elif self.writer:
+            self.write('game_data', replace_yaml_file, self.game_data_path, copy.deepcopy(self.game_data))
+        else:
+            super(JD2Game, self).save_game_data(*args, **kwargs)
+
+    def compact_game_data(self):
+        if self.game_data_journal:
+            # a save must not replace a pending compaction, the writer runs them in the order they were submitted
+            self.write('game_data_compaction', self.game_data_journal.compact, copy.deepcopy(self.game_data), self.game_data_path)
+
+    def save_settings(self, *args, **kwargs):
+        if self.writer:
+            self.write('settings', replace_yaml_file, self.settings_path, copy.deepcopy(self.user_settings))
+        else:
+            super(JD2Game, self).save_settings(*args, **kwargs)
+
+    def write(self, key, write, *args):
+        """Run the write in the background writer if there is one, the arguments belong to the writer from now on.
+           A newer write with the same key replaces a write that has not started yet."""
+        if self.writer:
+            self.writer.submit(key, write, *args)
+        else:
+            write(*args)
+
+    @property
+    def user_settings(self):
+        if self.ball_in_play and self.raw_settings_check:
+            caller = sys._getframe(1)
+            location = (caller.f_code.co_filename, caller.f_lineno)
+            if location not in self.raw_settings_readers:
+                self.raw_settings_readers.add(location)
+                self.settings_logger.warning('user_settings read during a ball at %s:%d, use settings_snapshot', *location)
+        return self.raw_user_settings
+
+    @user_settings.setter
+    def user_settings(self, user_settings):
+        self.raw_user_settings = user_settings
+
+    def create_switch_recorder(self):
+        path = config.value_for_key_path(keypath='switch_trace_path', default=None)
+        if not path:
+            return None
+
+        return self.open_switch_trace(time.strftime(path))
+
+    def open_switch_trace(self, path):
+        # no switch event was processed yet, these are the switch states the game was built with
+        closed_switches = [switch.number for switch in self.switches if switch.is_active() != (switch.type == 'NC')]
+        return SwitchRecorder(path, self.random_seed, closed_switches)
+
+    def process_event(self, event):
+        if self.switch_recorder and event['type'] in self.traced_event_types:
+            self.switch_recorder.record(time.time(), event['value'], event['type'])
+        return super(JD2Game, self).process_event(event)
+
+    def create_tick_profiler(self):
+        if not config.value_for_key_path(keypath='tick_profiler', default=False):
+            return None
+
+        # by default, a tick should not take longer than a DMD frame
+        budget_ms = config.value_for_key_path(keypath='tick_budget_ms', default=0)
+        if not budget_ms:
+            budget_ms = 1000.0 / config.value_for_key_path(keypath='dmd_framerate', default=60)
+        return TickProfiler(self.modes, budget_ms / 1000.0)
+
+    def end_run_loop(self):
+        self.compact_game_data()
+        if self.writer:
+            self.writer.close()
+        if self.switch_recorder:
+            self.switch_recorder.close()
+        if self.tick_profiler:
+            self.tick_profiler.logger.warning(self.tick_profiler.summary())
+        if config.value_for_key_path(keypath='startup_profile', default=False):
+            print(self.startup.report())
+        super(JD2Game, self).end_run_loop()
 
     def create_switch_monitor(self):
         return JDSwitchMonitor(self)
@@ -129,8 +386,12 @@ class JD2Game(SkeletonGame):
         pass
 
     def service_mode_ended(self):
+        # the settings may have changed
+        self.settings_snapshot = create_settings_snapshot(self.user_settings, self.settings)
         # tell the crane to restow to rest position in case the crane motor was powered during service mode
         self.deadworld.power_up = True
+        # lamp tests leave the lamps in an unknown state
+        self.lamp_shadow.invalidate()
         super(JD2Game, self).service_mode_ended()
 
     #
@@ -139,7 +400,7 @@ class JD2Game(SkeletonGame):
     
     def create_message_layer(self):
         """return a text layer at the bottom of the screen where the last line of the score display normally goes"""
-        layer = FixedSizeTextLayer(128/2, 32-7, font_named('Font07x5.dmd'), 'center', width=128, height=7, fill_color=(0,0,0,255))
+        layer = FixedSizeTextLayer(128/2, 32-7, font_named('Font07x5.dmd'), 'center', width=128, height=7, fill_color=(0,0,0,255), frame_cache=self.text_frame_cache)
 
         # slide in for 0.33s, stay still for 2s, slide out for 0.33s
         slide_in_transition = SlideTransition(direction='west')
@@ -174,6 +435,18 @@ class JD2Game(SkeletonGame):
         self.supergame = self.switchmonitor.superGame_button_pressed
         super(JD2Game, self).game_started()
 
+    def ball_starting(self):
+        self.ball_in_play = True
+        super(JD2Game, self).ball_starting()
+
+    def ball_ended(self):
+        self.ball_in_play = False
+        super(JD2Game, self).ball_ended()
+
+    def create_player(self, name):
+        # the player state keys are declared in playerstate.py
+        return JDPlayer(name)
+
     def ball_save_start(self, time, now, allow_multiple_saves):
         # We assume the number of balls to save is the number of balls requested by the game,
         # so launch the balls and/or eject from the planet if applicable before calling this method.
@@ -221,14 +494,8 @@ class JD2Game(SkeletonGame):
     #
 
     def send_event(self, event):
-        for mode in self.modes[:]:
-            if mode.is_started():
-                handler = getattr(mode, event, None)
-                if handler:
-                    ret = handler()
-                    if ret:
-                        # skip lower priority modes
-                        return ret
+        # a true value returned by a handler skips lower priority modes
+        return self.event_registry.send_event(event)
 
     #
     # High Scores
@@ -269,14 +536,52 @@ class JD2Game(SkeletonGame):
         # return data for both regulation play and supergame
         return get_highscore_data(self.all_highscore_categories)
 
+    def keep_score_frames(self):
+        layer = self.score_display.layer
+        next_frame = layer.next_frame
+        def next_score_frame():
+            frame = next_frame()
+            self.score_frame = frame
+            self.score_frame_scores = self.displayed_scores()
+            return frame
+        layer.next_frame = next_score_frame
+
+    def displayed_scores(self):
+        return (tuple(player.score for player in self.players), self.ball, self.current_player_index)
+
     def generate_score_layer(self):
-        frame = self.score_display.layer.next_frame()
-        return FrameLayer(frame=frame.copy(), opaque=True)
+        """Return a layer showing the last frame of the score display, its frame must be treated as read-only."""
+        # render only when the score display did not show the current scores yet, e.g. hidden by an opaque layer
+        if self.score_frame is None or self.score_frame_scores != self.displayed_scores():
+            self.score_display.layer.next_frame()
+        frame = self.score_frame
+        layer = self.score_display.layer
+        if frame is not None and frame is getattr(layer, 'buffer', None):
+            # the snapshot keeps the rendered buffer, the score display renders into a new one
+            layer.buffer = Frame(frame.width, frame.height)
+        return FrameLayer(frame=frame, opaque=True)
 
     #
     # lamps
     #
 
+    def update_lamps(self, now=False):
+        """Mark the lamps dirty, the lamps are recomputed once at the end of the current tick.
+           Pass now=True when the lamps must be refreshed right away."""
+        if not now:
+            self.lamp_update_requests += 1
+            return
+
+        self.lamp_update_requests = 0
+        # collect the lamp commands of all the modes and only send the lamps that changed
+        if self.lamp_shadow is None:
+            return super(JD2Game, self).update_lamps()
+        self.lamp_shadow.begin()
+        try:
+            super(JD2Game, self).update_lamps()
+        finally:
+            self.lamp_shadow.commit()
+
     def drive_lamp(self, lamp_name, style='on'):
         lamp_schedule = self.lamp_schedules[style]
         self.lamps[lamp_name].schedule(schedule=lamp_schedule)
@@ -0,0 +1,450 @@
+"""Headless simulator running JD2Game on the FakePinPROC with a virtual clock.
+
+There is no DMD window and no sound. The virtual clock only moves when the simulator advances it,
+the game runs as fast as the CPU allows. The switch events come from a script or from a random player.
+
+Run from the game directory:
+    python jd2sim.py --games 100 --seed 7
+    python jd2sim.py --games 1 --seed 7 --tick-ms 1 --record traces/seed7.jdt
+    python jd2sim.py --script session.txt
+    python jd2sim.py --replay traces/20260101-120000.jdt
+
+A script has one switch change per line: <seconds since start> <switch name> <active|inactive|pulse>
+"""
+
+import argparse
+from collections import defaultdict
+import heapq
+import logging
+import os
+import random
+import sys
+import time
+import timeit
+
+# the virtual clock replaces time.time(), keep a real clock to measure the cost of the ticks
+wall_clock = timeit.default_timer
+
+
+class VirtualClock(object):
+    """A clock replacing time.time() and time.sleep(), it only moves when the simulator advances it"""
+
+    def __init__(self, start):
+        self.start = start
+        self.now = start
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += max(0, seconds)
+
+    def advance(self, seconds):
+        self.now += seconds
+
+    def elapsed(self):
+        return self.now - self.start
+
+    def install(self):
+        # this must be done before importing the game, some modules bind time.time when imported
+        time.time = self.time
+        time.sleep = self.sleep
+
+
+# no window and no sound
+os.environ['SDL_VIDEODRIVER'] = 'dummy'
+os.environ['SDL_AUDIODRIVER'] = 'dummy'
+
+# the virtual clock must replace time.time() before the game modules are imported
+clock = VirtualClock(time.time())
+clock.install()
+
+import pinproc
+from procgame import config
+from jd2 import JD2Game
+from switchtrace import SwitchTrace
+
+
+class SimulatedGame(JD2Game):
+    """The game with the audits and high scores of the machine left untouched.
+       closed_switches are the numbers of the switches closed when the game is built, all switches are open by default."""
+
+    games_played = 0
+
+    def __init__(self, random_seed=None, closed_switches=None, switch_trace_path=None):
+        self.closed_switches = closed_switches
+        self.switch_trace_path = switch_trace_path
+        super(SimulatedGame, self).__init__(random_seed)
+
+    def load_config(self, filename):
+        super(SimulatedGame, self).load_config(filename)
+        # the switches start in their recorded state without firing any switch handler
+        if self.closed_switches is not None:
+            for switch in self.switches:
+                switch.set_state(switch.number in self.closed_switches)
+
+    def game_ended(self):
+        super(SimulatedGame, self).game_ended()
+        self.games_played += 1
+
+    def create_switch_recorder(self):
+        # simulated sessions are reproduced from the seed or the replayed trace, they are recorded on request
+        return self.open_switch_trace(self.switch_trace_path) if self.switch_trace_path else None
+
+    def create_game_data_journal(self):
+        return None
+
+    def save_settings(self, *args, **kwargs):
+        pass
+
+    def save_game_data(self, *args, **kwargs):
+        pass
+
+
+class Simulator(object):
+    """Runs the game loop on the virtual clock and injects switch events into the FakePinPROC"""
+
+    def __init__(self, game, clock, tick_seconds, render=False):
+        self.game = game
+        self.clock = clock
+        self.tick_seconds = tick_seconds
+        self.render = render
+        self.render_interval = 1.0 / config.value_for_key_path(keypath='dmd_framerate', default=60)
+        self.next_render = clock.now
+        self.player = None
+        self.pending = []
+        self.sequence = 0
+
+        # statistics
+        self.num_ticks = 0
+        self.num_switch_events = 0
+        self.tick_seconds_total = 0.0
+        self.tick_seconds_max = 0.0
+
+        for coil in game.coils:
+            self.watch_coil(coil)
+
+    def watch_coil(self, coil):
+        # tell the player about the coil commands, the ball model moves the balls accordingly
+        def watch(method, state):
+            send = getattr(coil, method)
+            def command(*args, **kwargs):
+                ret = send(*args, **kwargs)
+                if self.player:
+                    self.player.coil_changed(coil.name, state(args, kwargs))
+                return ret
+            setattr(coil, method, command)
+
+        # pulse(0) keeps the coil on until it is disabled
+        watch('pulse', lambda args, kwargs: 'on' if (args[0] if args else kwargs.get('milliseconds')) == 0 else 'pulse')
+        for method in ['enable', 'schedule', 'patter', 'pulsed_patter']:
+            if hasattr(coil, method):
+                watch(method, lambda args, kwargs: 'on')
+        watch('disable', lambda args, kwargs: 'off')
+
+    def at(self, when, handler, *args):
+        """Call the handler at the given virtual time"""
+        self.sequence += 1
+        heapq.heappush(self.pending, (when, self.sequence, handler, args))
+
+    def after(self, seconds, handler, *args):
+        self.at(self.clock.now + seconds, handler, *args)
+
+    def set_switch(self, name, active):
+        switch = self.game.switches[name]
+        # an NC switch is active when it is open
+        closed = active != (switch.type == 'NC')
+        event_type = pinproc.EventTypeSwitchClosedDebounced if closed else pinproc.EventTypeSwitchOpenDebounced
+        self.inject(switch.number, event_type)
+
+    def inject(self, switch_number, event_type):
+        self.game.proc.add_switch_event(switch_number, event_type)
+        self.num_switch_events += 1
+
+    def pulse_switch(self, name, seconds=0.05):
+        self.set_switch(name, True)
+        self.after(seconds, self.set_switch, name, False)
+
+    def run(self, seconds, max_games):
+        end = self.clock.now + seconds
+        while self.clock.now < end and self.game.games_played < max_games:
+            self.step()
+
+    def step(self):
+        """Run one tick of the game and advance the virtual clock"""
+        while self.pending and self.pending[0][0] <= self.clock.now:
+            (unused, unused, handler, args) = heapq.heappop(self.pending)
+            handler(*args)
+
+        # same sequence as the run loop of the framework
+        game = self.game
+        start = wall_clock()
+        for event in game.get_events():
+            game.process_event(event)
+        game.tick()
+        game.tick_virtual_drivers()
+        game.modes.tick()
+        game.proc.watchdog_tickle()
+        game.proc.flush()
+        if self.render and self.clock.now >= self.next_render:
+            self.next_render += self.render_interval
+            game.dmd.update()
+        elapsed = wall_clock() - start
+
+        self.num_ticks += 1
+        self.tick_seconds_total += elapsed
+        self.tick_seconds_max = max(self.tick_seconds_max, elapsed)
+        self.clock.advance(self.tick_seconds)
+
+    def report(self, wall_seconds):
+        game_seconds = self.clock.elapsed()
+        print('games played:      %d' % self.game.games_played)
+        print('simulated time:    %.1fs' % game_seconds)
+        print('wall clock time:   %.1fs (%.0fx real time)' % (wall_seconds, game_seconds / max(wall_seconds, 1e-6)))
+        print('switch events:     %d' % self.num_switch_events)
+        print('ticks:             %d' % self.num_ticks)
+        print('tick cost:         %.1f us average, %.1f us max' %
+              (1e6 * self.tick_seconds_total / max(self.num_ticks, 1), 1e6 * self.tick_seconds_max))
+        if self.game.tick_profiler:
+            print('tick profile:      ' + self.game.tick_profiler.summary())
+        print('final scores:      %s' % ' '.join(str(player.score) for player in self.game.players))
+
+
+class ScriptPlayer(object):
+    """Replays the switch changes listed in a script file"""
+
+    def __init__(self, sim, path):
+        self.sim = sim
+        self.duration = 0
+        self.switch_names = set(switch.name for switch in sim.game.switches)
+        with open(path) as f:
+            for line in f:
+                line = line.split('#')[0].strip()
+                if line:
+                    (seconds, name, action) = line.split()
+                    self.schedule(float(seconds), name, action)
+
+    def schedule(self, seconds, name, action):
+        if name not in self.switch_names:
+            raise ValueError('unknown switch ' + name)
+        if action == 'pulse':
+            self.sim.at(self.sim.clock.now + seconds, self.sim.pulse_switch, name)
+        elif action in ['active', 'inactive']:
+            self.sim.at(self.sim.clock.now + seconds, self.sim.set_switch, name, action == 'active')
+        else:
+            raise ValueError('unknown action ' + action)
+        self.duration = max(self.duration, seconds)
+
+    def coil_changed(self, name, state):
+        pass
+
+
+class TracePlayer(object):
+    """Replays the switch events of a trace recorded by the game at the time they were received.
+       The switch states recorded when the game was built are given to SimulatedGame."""
+
+    def __init__(self, sim, trace):
+        self.duration = 0
+        for (seconds, switch_number, event_type) in trace.events:
+            # the times are rounded to the millisecond, inject slightly early to land on the recorded tick
+            sim.at(trace.start_time + seconds - 0.0005, sim.inject, switch_number, event_type)
+            self.duration = seconds
+
+    def coil_changed(self, name, state):
+        pass
+
+
+class RandomPlayer(object):
+    """Starts games and plays them with a simple ball model.
+
+       Every ball on the playfield randomly hits a shot every few seconds.
+       The balls held in the trough, shooter lanes, poppers and planet are released by their coil.
+    """
+
+    # sequences of switches hit by a ball, with their relative frequency
+    shots = [
+        (['slingL'], 10), (['slingR'], 10), (['inlaneL'], 4), (['inlaneR'], 4), (['inlaneFarR'], 3),
+        (['leftRollover'], 3), (['topCenterRollover'], 3), (['leftScorePost'], 2), (['rightTopPost'], 2),
+        (['threeBankTargets'], 4), (['captiveBall1'], 2), (['captiveBall2'], 2), (['captiveBall3'], 1),
+        (['mystery'], 3), (['topRightOpto', 'topRampExit'], 3),
+        (['leftRampEnter', 'leftRampExit'], 5), (['leftRampEnterAlt', 'leftRampExit'], 2),
+        (['rightRampEnter', 'rightRampExit'], 5), (['rightRampEnter', 'centerRampExit'], 3),
+        (['dropTargetJ'], 2), (['dropTargetU'], 2), (['dropTargetD'], 2), (['dropTargetG'], 2), (['dropTargetE'], 2),
+        (['popperL'], 3), (['popperR'], 3), (['subwayEnter1', 'subwayEnter2', 'shooterL'], 3),
+        (['leftRampEnter', 'leftRampToLock'], 2),
+        (['outlaneL', 'drain'], 2), (['outlaneR', 'drain'], 2), (['drain'], 4),
+    ]
+
+    # switches holding a ball until their coil fires
+    holes = ['popperL', 'popperR', 'shooterL', 'shooterR']
+
+    drop_targets = ['dropTargetJ', 'dropTargetU', 'dropTargetD', 'dropTargetG', 'dropTargetE']
+
+    def __init__(self, sim, seed):
+        self.sim = sim
+        self.game = sim.game
+        # the player has its own generator, separate from the seeded generator of the rules
+        self.random = random.Random(seed)
+        self.coils = defaultdict(lambda: 'off')
+        self.held = defaultdict(int)
+        self.trough_balls = self.game.num_balls_total
+        self.planet_balls = 0
+        self.magnet_holds_ball = False
+        self.globe_turning = False
+
+        self.weights = []
+        total = 0
+        for (switches, weight) in self.shots:
+            total += weight
+            self.weights.append(total)
+
+        # bring the switches in line with the ball model
+        for switch in self.game.switches:
+            active = switch.name in ['alwaysClosed', 'coinDoor']
+            if switch.is_active() != active:
+                sim.set_switch(switch.name, active)
+        self.update_trough()
+        sim.after(1, self.press_start)
+
+    def press_start(self):
+        if self.game.attract_mode in self.game.modes:
+            self.sim.pulse_switch('startButton', 0.1)
+        self.sim.after(self.random.uniform(2, 10), self.press_start)
+
+    def update_trough(self):
+        for index in range(1, 7):
+            self.sim.set_switch('trough%d' % index, index <= self.trough_balls)
+
+    def roll(self):
+        """A ball is on the playfield, it will hit a shot soon"""
+        self.sim.after(self.random.uniform(0.5, 4), self.shoot)
+
+    def shoot(self):
+        if self.random.random() < 0.3:
+            # the player flips
+            self.sim.pulse_switch(self.random.choice(['flipperLwL', 'flipperLwR']), 0.15)
+
+        target = self.random.uniform(0, self.weights[-1])
+        (switches, unused) = next(shot for (shot, total) in zip(self.shots, self.weights) if target <= total)
+        for (index, name) in enumerate(switches):
+            self.sim.after(0.2 * index, self.hit, name)
+
+    def hit(self, name):
+        if name == 'drain':
+            self.sim.after(1, self.drained)
+        elif name == 'leftRampToLock':
+            self.sim.pulse_switch(name)
+            self.planet_balls += 1
+        elif name in self.holes:
+            self.held[name] += 1
+            self.sim.set_switch(name, True)
+        elif name in self.drop_targets:
+            # a drop target stays down until the bank is reset
+            self.sim.set_switch(name, True)
+            self.roll()
+        else:
+            self.sim.pulse_switch(name)
+            if name not in ['subwayEnter1', 'subwayEnter2', 'leftRampEnter', 'rightRampEnter', 'topRightOpto', 'outlaneL', 'outlaneR']:
+                self.roll()
+
+    def drained(self):
+        self.trough_balls += 1
+        self.update_trough()
+
+    def plunge(self):
+        if self.held['shooterR']:
+            self.sim.pulse_switch('fireR', 0.1)
+
+    def coil_changed(self, name, state):
+        was_on = self.coils[name] == 'on'
+        self.coils[name] = state
+        if state == 'off' or (state == 'on' and was_on):
+            if name == 'craneMagnet' and state == 'off' and self.magnet_holds_ball:
+                # the crane dropped the ball outside the planet
+                self.magnet_holds_ball = False
+                self.sim.pulse_switch('craneRelease')
+                self.roll()
+            return
+
+        if name == 'trough' and self.trough_balls:
+            self.trough_balls -= 1
+            self.update_trough()
+            self.sim.after(0.5, self.hit, 'shooterR')
+            self.sim.after(self.random.uniform(1.5, 4), self.plunge)
+        elif name in self.holes and self.held[name]:
+            self.held[name] -= 1
+            self.sim.set_switch(name, self.held[name] > 0)
+            self.sim.after(0.5, self.roll)
+        elif name == 'resetDropTarget':
+            for target in self.drop_targets:
+                self.sim.set_switch(target, False)
+        elif name == 'globeMotor' and not self.globe_turning:
+            self.globe_turning = True
+            self.turn_globe()
+        elif name == 'crane':
+            # the crane reaches the ring and moves past it
+            self.sim.after(1, self.sim.pulse_switch, 'magnetOverRing', 0.2)
+        elif name == 'craneMagnet' and self.planet_balls:
+            self.planet_balls -= 1
+            self.magnet_holds_ball = True
+
+    def turn_globe(self):
+        if self.coils['globeMotor'] == 'off':
+            self.globe_turning = False
+        else:
+            self.sim.pulse_switch('globePosition2', 0.1)
+            self.sim.after(0.5, self.turn_globe)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run Judge Dredd headless on a virtual clock')
+    parser.add_argument('--games', type=int, default=1, help='stop after this number of games')
+    parser.add_argument('--seconds', type=float, default=float('inf'), help='stop after this number of simulated seconds')
+    parser.add_argument('--seed', type=int, default=None, help='seed of the random player')
+    parser.add_argument('--script', help='play the switch changes listed in this file instead of the random player')
+    parser.add_argument('--replay', help='replay the switch trace recorded by the game in this file')
+    parser.add_argument('--record', help='record the switch events of the simulation to this file')
+    parser.add_argument('--tick-ms', type=float, default=None, help='simulated time between two ticks of the run loop, 10ms or 1ms when replaying')
+    parser.add_argument('--render', action='store_true', help='compose the DMD frames at the DMD frame rate')
+    args = parser.parse_args()
+
+    seed = args.seed if args.seed is not None else random.randrange(2**31)
+    closed_switches = None
+    if args.replay:
+        # same wall clock time, same random numbers and same switch states as the recorded session
+        trace = SwitchTrace(args.replay)
+        clock.start = clock.now = trace.start_time
+        seed = trace.random_seed
+        closed_switches = trace.closed_switches
+
+    tick_ms = args.tick_ms or (1 if args.replay else 10)
+    game = SimulatedGame(random_seed=seed, closed_switches=closed_switches, switch_trace_path=args.record)
+    sim = Simulator(game, clock, tick_ms / 1000.0, args.render)
+
+    if args.replay:
+        sim.player = TracePlayer(sim, trace)
+        seconds = min(args.seconds, sim.player.duration + 5)
+        max_games = float('inf')
+    elif args.script:
+        sim.player = ScriptPlayer(sim, args.script)
+        seconds = min(args.seconds, sim.player.duration + 5)
+        max_games = float('inf')
+    else:
+        sim.player = RandomPlayer(sim, seed)
+        seconds = args.seconds
+        max_games = args.games
+
+    start = wall_clock()
+    try:
+        sim.run(seconds, max_games)
+    except Exception:
+        logging.exception('simulation failed after %.3fs of game time, random seed %d', clock.elapsed(), seed)
+        sys.exit(1)
+    finally:
+        if game.switch_recorder:
+            game.switch_recorder.close()
+    sim.report(wall_clock() - start)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+from collections import OrderedDict
+
+class LampShadow(object):
+    """Shadow table of the lamp schedules last sent to the P-ROC.
+
+       The schedule(), enable() and disable() commands of every lamp go through the table.
+       Outside of a pass, commands are sent right away and recorded.
+       During a pass, commands are collected and only the final schedule of each lamp is kept.
+       At the end of the pass, only the lamps whose final schedule differs from the hardware are sent.
+    """
+
+    def __init__(self, lamps):
+        self.hardware = {}
+        self.senders = {}
+        self.pending = None
+        self.depth = 0
+        self.num_received = 0
+        self.commands_saved = 0
+        self.total_commands_saved = 0
+        for lamp in lamps:
+            self.install(lamp)
+
+    def install(self, lamp):
+        # replace the lamp methods with methods routing the commands through the shadow table
+        self.senders[lamp.name] = {'schedule': lamp.schedule, 'enable': lamp.enable, 'disable': lamp.disable}
+        lamp.schedule = lambda schedule, cycle_seconds=0, now=True: self.command(lamp.name, 'schedule', schedule, cycle_seconds, now)
+        lamp.enable = lambda: self.command(lamp.name, 'enable', 0xffffffff)
+        lamp.disable = lambda: self.command(lamp.name, 'disable', 0)
+
+    def invalidate(self):
+        """Forget what the hardware holds, the next pass sends every lamp it drives"""
+        self.hardware.clear()
+
+    def begin(self):
+        if self.depth == 0:
+            self.pending = OrderedDict()
+            self.num_received = 0
+        self.depth += 1
+
+    def commit(self):
+        self.depth -= 1
+        if self.depth == 0:
+            pending = self.pending
+            self.pending = None
+            num_sent = 0
+            for (lamp_name, command) in pending.items():
+                if self.hardware.get(lamp_name) != command[1:3]:
+                    self.send(lamp_name, command)
+                    num_sent += 1
+            self.commands_saved = self.num_received - num_sent
+            self.total_commands_saved += self.commands_saved
+
+    def command(self, lamp_name, method, schedule, cycle_seconds=0, now=True):
+        command = (method, schedule, cycle_seconds, now)
+        if self.pending is None:
+            self.send(lamp_name, command)
+        else:
+            # the last command of the pass wins
+            self.pending[lamp_name] = command
+            self.num_received += 1
+
+    def send(self, lamp_name, command):
+        (method, schedule, cycle_seconds, now) = command
+        sender = self.senders[lamp_name][method]
+        if method == 'schedule':
+            sender(schedule=schedule, cycle_seconds=cycle_seconds, now=now)
+        else:
+            sender()
+        # a schedule running for a limited time ends on its own, its final state is unknown
+        self.hardware[lamp_name] = (schedule, cycle_seconds) if cycle_seconds == 0 else None
@@ -0,0 +1,95 @@
+"""Compiler of the lampshow files into per-lamp hardware schedules.
+
+In a lampshow file, each track is a line: <lamp name or coil:name> | <steps>
+Every character is a step of 1/32 second, a space turns the lamp off, any other character turns it on.
+Each second of a track is a 32-bit schedule word, the first step in the least significant bit.
+The compiler merges the consecutive seconds with the same word into a run, a run is sent to the P-ROC
+as a single schedule lasting the length of the run instead of one schedule per second.
+A schedule turns the driver off when it runs out, so the runs of off steps are not sent except to start the show.
+"""
+
+from collections import defaultdict
+from itertools import groupby
+import os
+import yaml
+
+
+def schedule_words(steps):
+    words = []
+    for index in range(0, len(steps), 32):
+        word = 0
+        for (bit, step) in enumerate(steps[index:index + 32]):
+            if step != ' ':
+                word |= 1 << bit
+        words.append(word)
+    return words
+
+
+class CompiledLampShow(object):
+    """A lampshow as a list of tracks (kind, driver name, runs) where kind is 'lamp' or 'coil'
+       and runs is a list of (schedule word, number of seconds)"""
+
+    def __init__(self, tracks, num_seconds):
+        self.tracks = tracks
+        self.num_seconds = num_seconds
+        self.plans = {}
+
+    @classmethod
+    def compile(cls, path):
+        parsed = []
+        with open(path) as f:
+            for line in f:
+                line = line.rstrip('\r\n')
+                if not line.strip() or line.startswith('#'):
+                    continue
+                (name, steps) = line.split('|', 1)
+                name = name.strip()
+                (kind, name) = ('coil', name[len('coil:'):]) if name.startswith('coil:') else ('lamp', name)
+                parsed.append((kind, name, schedule_words(steps[1:])))
+
+        num_seconds = max(len(words) for (kind, name, words) in parsed) if parsed else 0
+        tracks = []
+        for (kind, name, words) in parsed:
+            words += [0] * (num_seconds - len(words))
+            tracks.append((kind, name, [(word, len(list(run))) for (word, run) in groupby(words)]))
+        return cls(tracks, num_seconds)
+
+    def to_data(self):
+        return {'num_seconds': self.num_seconds, 'tracks': [[kind, name, [list(run) for run in runs]] for (kind, name, runs) in self.tracks]}
+
+    @classmethod
+    def from_data(cls, data):
+        return cls([(kind, name, [tuple(run) for run in runs]) for (kind, name, runs) in data['tracks']], data['num_seconds'])
+
+    def commands(self, first_loop=True, repeat=False):
+        """Return the sorted list of (second, [(kind, driver name, schedule word, cycle seconds)]) to play the show once.
+           When the show repeats, a track with a single run is scheduled forever on the first loop only.
+           An off run is sent only at the very start, later the previous schedule runs out by itself."""
+        plan = self.plans.get((first_loop, repeat))
+        if plan is None:
+            steps = defaultdict(list)
+            for (kind, name, runs) in self.tracks:
+                endless = repeat and len(runs) == 1
+                if endless and not first_loop:
+                    continue
+                second = 0
+                for (word, num_seconds) in runs:
+                    if word or (first_loop and second == 0):
+                        steps[second].append((kind, name, word, 0 if endless else num_seconds))
+                    second += num_seconds
+            plan = sorted(steps.items())
+            self.plans[(first_loop, repeat)] = plan
+        return plan
+
+
+def load_lampshows(asset_list_path, lampshow_path, pack=None):
+    """Return the compiled shows of the LampShows section by key, from the asset pack when it is up to date"""
+    with open(asset_list_path) as f:
+        asset_list = yaml.safe_load(f)
+
+    shows = {}
+    for entry in asset_list.get('LampShows') or []:
+        path = os.path.join(lampshow_path, entry['file'])
+        data = pack.lampshow(path) if pack else None
+        shows[entry['key']] = CompiledLampShow.from_data(data) if data else CompiledLampShow.compile(path)
+    return shows
@@ -1,12 +1,44 @@
+from collections import OrderedDict
 import time
-from procgame.dmd import Frame, LayerTransitionBase, TextLayer
+from procgame.dmd import ExpandTransition, Frame, GroupedLayer, LayerTransitionBase, TextLayer
+
+class TextFrameCache(object):
+    """LRU cache of pre-rendered text frames keyed by (font, text, justify, width, height, fill_color)
+       The cached frames are shared between all the callers, they must be treated as read-only."""
+
+    def __init__(self, max_size=64):
+        self.max_size = max_size
+        self.frames = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        frame = self.frames.pop(key, None)
+        if frame is None:
+            self.misses += 1
+        else:
+            # move to the most recently used end
+            self.frames[key] = frame
+            self.hits += 1
+        return frame
+
+    def put(self, key, frame):
+        if self.max_size > 0:
+            self.frames[key] = frame
+            if len(self.frames) > self.max_size:
+                self.frames.popitem(last=False)
+
+    def clear(self):
+        self.frames.clear()
+
 
 class FixedSizeTextLayer(TextLayer):
     """A TextLayer where the text and blank blinking frames are opaque over the whole fixed width x height"""
 
-    def __init__(self, x, y, font, justify='left', opaque=False, width=128, height=32, fill_color=None):
+    def __init__(self, x, y, font, justify='left', opaque=False, width=128, height=32, fill_color=None, frame_cache=None):
         super(FixedSizeTextLayer, self).__init__(x, y, font, justify, opaque, width, height, fill_color)
         self.blank_frame = Frame(width, height)
+        self.frame_cache = frame_cache
 
     def set_text(self, text, seconds=None, blink_frames=None):
         """Displays the given message for the given number of seconds."""
@@ -30,13 +62,29 @@ class FixedSizeTextLayer(TextLayer):
                 (self.target_x_offset, self.target_y_offset) = (0, 0)
 
             self.set_target_position(self.x, self.y)
-            self.frame = Frame(width=self.width, height=self.height)
-            if self.fill_color != None:
-                self.frame.fill_rect(0, 0, self.width, self.height, self.fill_color)
-            self.font.draw(self.frame, text, x, y)
+            self.frame = self.render_text(text, x, y)
 
         return self
 
+    def render_text(self, text, x, y):
+        """Return the frame for the given text, reusing the cached frame when the same text was already rendered"""
+        if self.frame_cache is None:
+            return self.draw_text(text, x, y)
+
+        key = (self.font, text, self.justify, self.width, self.height, self.fill_color)
+        frame = self.frame_cache.get(key)
+        if frame is None:
+            frame = self.draw_text(text, x, y)
+            self.frame_cache.put(key, frame)
+        return frame
+
+    def draw_text(self, text, x, y):
+        frame = Frame(width=self.width, height=self.height)
+        if self.fill_color != None:
+            frame.fill_rect(0, 0, self.width, self.height, self.fill_color)
+        self.font.draw(frame, text, x, y)
+        return frame
+
     def next_frame(self):
         if self.started_at == None:
             self.started_at = time.time()
@@ -55,6 +103,116 @@ class FixedSizeTextLayer(TextLayer):
         return self.frame
 
 
+class LastTextMixin(object):
+    """Mixin for a TextLayer subclass that skips rendering when set_text() is called again with the same text.
+       Text displayed for a number of seconds is always rendered since that restarts the timer."""
+
+    last_text = None
+    renders = 0
+    skipped_renders = 0
+
+    def set_text(self, text, seconds=None, blink_frames=None):
+        last_text = (text, blink_frames)
+        if seconds is None and last_text == self.last_text:
+            self.skipped_renders += 1
+            return self
+        self.last_text = last_text if seconds is None else None
+        self.renders += 1
+        return super(LastTextMixin, self).set_text(text, seconds, blink_frames)
+
+
+class LastTextLayer(LastTextMixin, TextLayer):
+    """A TextLayer that only renders its text when it changes"""
+    pass
+
+
+class CachedGroupedLayer(GroupedLayer):
+    """A GroupedLayer that composites its children again only when one of them changed.
+       A child changes when it returns another frame, moves or changes its composite_op, every change bumps the generation.
+       The children must return a new frame when their content changes like TextLayer and AnimatedLayer do,
+       a child drawing into the same buffer again and again must be a CachedGroupedLayer itself.
+       While a child has a transition, the layer composites like a GroupedLayer on every tick."""
+
+    def __init__(self, width, height, layers=None, fill_color=None, opaque=False):
+        super(CachedGroupedLayer, self).__init__(width, height, layers, fill_color, opaque)
+        self.generation = 0
+        self.children = None
+        self.composited = None
+        self.compositions = 0
+        self.reuses = 0
+
+    def next_frame(self):
+        # a transition draws over the frame below the child, only composite_next() applies it
+        if any(layer.transition is not None for layer in self.layers if layer.enabled):
+            self.generation += 1
+            self.children = None
+            self.compositions += 1
+            return super(CachedGroupedLayer, self).next_frame()
+
+        # the children still advance on every tick, blinking and timed text included
+        children = [(layer, layer.next_frame() if layer.enabled else None,
+                     layer.target_x + getattr(layer, 'target_x_offset', 0), layer.target_y + getattr(layer, 'target_y_offset', 0),
+                     layer.composite_op, getattr(layer, 'generation', 0)) for layer in self.layers]
+        if self.children is not None and len(children) == len(self.children) and \
+                all(child[0] is last[0] and child[1] is last[1] and child[2:] == last[2:] for (child, last) in zip(children, self.children)):
+            self.reuses += 1
+            return self.composited
+
+        self.generation += 1
+        self.children = children
+        self.composited = self.composite(children)
+        self.compositions += 1
+        return self.composited
+
+    def composite(self, children):
+        # same as GroupedLayer.next_frame() with the frames the children already returned
+        self.buffer.clear()
+        if self.fill_color is not None:
+            self.buffer.fill_rect(0, 0, self.buffer.width, self.buffer.height, self.fill_color)
+        composited = False
+        for (layer, frame, x, y, composite_op, generation) in children:
+            if frame is not None:
+                Frame.copy_rect(dst=self.buffer, dst_x=x, dst_y=y, src=frame, src_x=0, src_y=0,
+                                width=frame.width, height=frame.height, op=composite_op)
+                composited = True
+                # an opaque child that drew something hides the children after it
+                if layer.opaque:
+                    break
+        return self.buffer if composited else None
+
+
+class ScratchFrames(object):
+    """Frames reused by transitions instead of allocating a new frame on every tick.
+       The frames are double buffered per size, the frame returned on the previous tick is never overwritten."""
+
+    # a blank frame is never written to, it can be shared by everybody
+    blank_frames = {}
+
+    def __init__(self):
+        self.buffers = {}
+        self.allocations = 0
+
+    def blank(self, width, height):
+        frame = self.blank_frames.get((width, height))
+        if frame is None:
+            frame = Frame(width, height)
+            self.blank_frames[(width, height)] = frame
+            self.allocations += 1
+        return frame
+
+    def next(self, width, height):
+        """Return a cleared frame of the given size, alternating between two buffers"""
+        buffers = self.buffers.get((width, height))
+        if buffers is None:
+            buffers = [Frame(width, height), Frame(width, height)]
+            self.buffers[(width, height)] = buffers
+            self.allocations += 2
+        buffers.reverse()
+        frame = buffers[0]
+        frame.clear()
+        return frame
+
+
 class SlideTransition(LayerTransitionBase):
     """A transition that scrolls the to_frame over a blank frame"""
 
@@ -62,13 +220,14 @@ class SlideTransition(LayerTransitionBase):
         super(SlideTransition, self).__init__()
         self.direction = direction
         self.progress_per_frame = 1.0/20.0
+        self.scratch = ScratchFrames()
 
     def next_frame(self, from_frame, to_frame):
-        blank_frame = Frame(to_frame.width, to_frame.height)
+        blank_frame = self.scratch.blank(to_frame.width, to_frame.height)
         return super(SlideTransition, self).next_frame(blank_frame, to_frame)
 
     def transition_frame(self, from_frame, to_frame):
-        frame = Frame(width=to_frame.width, height=to_frame.height)
+        frame = self.scratch.next(to_frame.width, to_frame.height)
         prog = -self.progress if self.in_out == 'out' else 1.0 - self.progress
         dst_x, dst_y = {
          'north': (0,  prog*frame.height),
@@ -80,6 +239,26 @@ class SlideTransition(LayerTransitionBase):
         return frame
 
 
+class ScratchExpandTransition(ExpandTransition):
+    """The ExpandTransition drawing into scratch frames"""
+
+    def __init__(self, direction='vertical'):
+        super(ScratchExpandTransition, self).__init__(direction)
+        self.scratch = ScratchFrames()
+
+    def transition_frame(self, from_frame, to_frame):
+        frame = self.scratch.next(from_frame.width, from_frame.height)
+        prog = 1.0 - self.progress if self.in_out == 'out' else self.progress
+        if self.direction == 'vertical':
+            (dst_x, dst_y) = (0, frame.height/2 - prog*(frame.height/2))
+            (width, height) = (frame.width, prog*frame.height)
+        else:
+            (dst_x, dst_y) = (frame.width/2 - prog*(frame.width/2), 0)
+            (width, height) = (prog*frame.width, frame.height)
+        Frame.copy_rect(dst=frame, dst_x=dst_x, dst_y=dst_y, src=to_frame, src_x=dst_x, src_y=dst_y, width=width, height=height, op='copy')
+        return frame
+
+
 class DontMoveTransition(LayerTransitionBase):
     """A transition that does not move, this can be useful within a GroupedTransition"""
     def transition_frame(self, from_frame, to_frame):
@@ -95,6 +274,12 @@ class GroupedTransition(LayerTransitionBase):
         self.transitions = transitions
         self.current = 0
 
+        # only one transition runs at a time, they can all draw in the same scratch frames
+        self.scratch = ScratchFrames()
+        for transition in transitions:
+            if hasattr(transition, 'scratch'):
+                transition.scratch = self.scratch
+
     def start(self):
         self.reset()
         self.transitions[self.current].start()
@@ -1,27 +1,35 @@
-from random import shuffle
-from procgame.dmd import FrameLayer, GroupedLayer, MarkupFrameGenerator, PanningLayer, PushTransition, ScriptedLayer, TextLayer
+from random import Random
+from procgame.dmd import FrameLayer, MarkupFrameGenerator, PanningLayer, PushTransition, ScriptedLayer, TextLayer
 from procgame.game import AdvancedMode
 from procgame.highscore import generate_highscore_frames
 from procgame.sound import PLAY_NOTBUSY
+from layers import CachedGroupedLayer
 
 class Attract(AdvancedMode):
     """A mode that runs whenever the attract show is in progress."""
 
+    # the markup frames do not depend on the game, they are rendered once for all the instances
+    markup_frames = {}
+
     def __init__(self, game, priority):
         super(Attract, self).__init__(game, priority)
         self.quick_start_button = None
         self.lampshow_keys = ['attract0', 'attract1']
+        # the attract mode runs for as long as it likes, it must not draw from the generator of the rules
+        self.lampshow_random = Random()
+        self.script_key = None
+        self.script_layer = None
 
         font_large = self.game.fonts['large']
         jd_text = TextLayer(128/2, 7, font_large, 'center').set_text('Judge Dredd')
-        self.jd_layer = GroupedLayer(width=128, height=32, layers=[jd_text], fill_color=(0,0,0,255), opaque=True)
+        self.jd_layer = CachedGroupedLayer(width=128, height=32, layers=[jd_text], fill_color=(0,0,0,255), opaque=True)
         self.jd_layer.transition = PushTransition(direction='south')
 
         self.gun_layer = self.game.animations['gun_powerup']
         self.score_layer = self.game.generate_score_layer()
 
         high_score_text = TextLayer(128/2, 7, font_large, 'center').set_text('High Scores')
-        self.high_scores_title_layer = GroupedLayer(width=128, height=32, layers=[high_score_text], fill_color=(0,0,0,255), opaque=True)
+        self.high_scores_title_layer = CachedGroupedLayer(width=128, height=32, layers=[high_score_text], fill_color=(0,0,0,255), opaque=True)
         self.high_scores_title_layer.transition = PushTransition(direction='north')
 
         self.cityscape_layer = self.game.animations['cityscape']
@@ -36,9 +44,8 @@ class Attract(AdvancedMode):
 
         self.font_plain = game.fonts['medium']
         self.font_bold = game.fonts['bold']
-        gen = MarkupFrameGenerator(game, self.font_plain, self.font_bold)
- 
-        credits_frame = gen.frame_for_markup("""
+
+        credits_frame = self.markup_frame('credits', """
 
 
 #CREDITS#
@@ -67,7 +74,7 @@ class Attract(AdvancedMode):
         self.credits_layer = PanningLayer(width=128, height=32, frame=credits_frame, origin=(0, 0), translate=(0, 1), bounce=False, numFramesDrawnBetweenMovementUpdate=2, fill_color=(0,0,0,255))
         self.judges_layer = self.game.animations['darkjudges']
 
-        instruct_frame = MarkupFrameGenerator(game, self.font_plain, self.font_bold).frame_for_markup("""
+        instruct_frame = self.markup_frame('instructions', """
 
 
 #INSTRUCTIONS#
@@ -122,18 +129,40 @@ Collect a multiball jackpot
         self.change_lampshow()
         self.display()
 
+        # write the game data journal to the YAML file while nobody is playing
+        self.delay(name='compact_game_data', event_type=None, delay=self.game.game_data_compact_delay, handler=self.game.compact_game_data)
+
     def mode_stopped(self):
         self.game.lamps.startButton.enable()
         self.game.lamps.superGame.enable()
         self.game.lampctrl.stop_show()
+        self.cancel_delayed('compact_game_data')
+
+    def markup_frame(self, key, markup):
+        frame = Attract.markup_frames.get(key)
+        if frame is None:
+            frame = MarkupFrameGenerator(self.game, self.font_plain, self.font_bold).frame_for_markup(markup)
+            Attract.markup_frames[key] = frame
+        return frame
 
     def display(self):
         self.showing_instructions = False
+        self.score_layer_index = 2  # index of self.score_layer in script
+
+        # the high scores only change at the end of a game or when they are cleared,
+        # the score layer is replaced at the end of a game
+        tables = [self.game.game_data.get(category.game_data_key) for category in self.game.all_highscore_categories]
+        script_key = (repr(tables), self.score_layer)
+        if script_key != self.script_key:
+            self.script_layer = self.create_script_layer()
+            self.script_key = script_key
+        self.layer = self.script_layer
+        self.layer.reset()
+
+    def create_script_layer(self):
         hs_frames = generate_highscore_frames(self.game.all_highscore_categories, self.game, self.font_plain, self.font_bold, self.game.dmd_width, self.game.dmd_height)
         hs_script = [{'seconds':1.25, 'layer':FrameLayer(frame=f)} for f in hs_frames]
 
-        self.score_layer_index = 2  # index of self.score_layer in script
-
         script = \
             [{'seconds':3.0, 'layer':self.jd_layer},
             {'seconds':3.0, 'layer':self.gun_layer},
@@ -150,8 +179,7 @@ Collect a multiball jackpot
             {'seconds':6.0, 'layer':self.credits_layer},
             {'seconds':3.0, 'layer':self.judges_layer}]
 
-        self.layer = ScriptedLayer(width=128, height=32, script=script, opaque=True)
-        self.layer.reset()
+        return ScriptedLayer(width=128, height=32, script=script, opaque=True)
 
     def display_instructions(self):
         self.showing_instructions = True
@@ -164,13 +192,13 @@ Collect a multiball jackpot
         font_medium = self.game.fonts['medium']
         press_layer = TextLayer(128/2, 8, font_medium, 'center').set_text(button_text, seconds=None, blink_frames=blink_frame)
         play_layer = TextLayer(128/2, 17, font_medium, 'center').set_text(play_text, seconds=None, blink_frames=blink_frame)
-        start_layer = GroupedLayer(128, 32, [press_layer, play_layer], fill_color=(0,0,0,255), opaque=True)
+        start_layer = CachedGroupedLayer(128, 32, [press_layer, play_layer], fill_color=(0,0,0,255), opaque=True)
         if direction:
             start_layer.transition = PushTransition(direction=direction)
         return start_layer
 
     def change_lampshow(self):
-        shuffle(self.lampshow_keys)
+        self.lampshow_random.shuffle(self.lampshow_keys)
         self.game.lampctrl.play_show(self.lampshow_keys[0], repeat=True)
         self.delay(name='lampshow', event_type=None, delay=10, handler=self.change_lampshow)
 
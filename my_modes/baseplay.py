@@ -1,11 +1,11 @@
-from random import randint
-from procgame.dmd import AnimatedLayer, GroupedLayer, TextLayer
+from procgame.dmd import AnimatedLayer
 from procgame.game import AdvancedMode
 from procgame.modes import Replay
 from boring import Boring
 from bonus import Bonus
 from challenge import UltimateChallenge
 from combos import Combos
+from layers import CachedGroupedLayer, LastTextLayer
 from regular import RegularPlay
 from status import StatusReport
 
@@ -261,8 +261,8 @@ class BasePlay(AdvancedMode):
 
     def light_extra_ball(self):
         extra_balls_lit = self.game.getPlayerState('extra_balls_lit')
-        max_extra_balls_per_game = self.game.user_settings['Machine']['Max extra balls per game']
-        max_extra_balls_lit = self.game.user_settings['Machine']['Max extra balls lit']
+        max_extra_balls_per_game = self.game.settings_snapshot.machine.max_extra_balls_per_game
+        max_extra_balls_lit = self.game.settings_snapshot.machine.max_extra_balls_lit
 
         if extra_balls_lit + self.total_extra_balls == max_extra_balls_per_game:
             self.game.set_status('EXTRA BALLS MAXED')
@@ -300,10 +300,10 @@ class BasePlay(AdvancedMode):
 
     def replay_callback(self):
         self.game.coils.knocker.pulse()
-        replay_award = self.game.user_settings['Replay']['Replay Award']
+        replay_award = self.game.settings_snapshot.replay.replay_award
 
         if replay_award == 'Extra Ball':
-            max_extra_balls_per_game = self.game.user_settings['Machine']['Max extra balls per game']
+            max_extra_balls_per_game = self.game.settings_snapshot.machine.max_extra_balls_per_game
             if self.total_extra_balls < max_extra_balls_per_game:
                 extra_balls_lit = self.game.getPlayerState('extra_balls_lit')
                 if extra_balls_lit + self.total_extra_balls == max_extra_balls_per_game:
@@ -440,9 +440,9 @@ class BasePlay(AdvancedMode):
         self.shake(schedule=0xf)
 
     def shooterL_variable_pulse(self):
-        pulse_min = self.game.user_settings['Coil Strength']['shooterL Min']
-        pulse_max = self.game.user_settings['Coil Strength']['shooterL Max']
-        pulse_rand = randint(pulse_min, pulse_max)
+        pulse_min = self.game.settings_snapshot.coil_strength.shooterl_min
+        pulse_max = self.game.settings_snapshot.coil_strength.shooterl_max
+        pulse_rand = self.game.random.randint(pulse_min, pulse_max)
         self.game.coils.shooterL.pulse(pulse_rand)
         self.game.stall_search.mark_captive('shooterL', is_captive=False)
 
@@ -539,24 +539,46 @@ class ModesDisplay(AdvancedMode):
 
     def __init__(self, game, priority):
         super(ModesDisplay, self).__init__(game, priority, AdvancedMode.Ball)
-        self.large_text_layer = TextLayer(128/2, 7, self.game.fonts['large'], 'center', fill_color=(0,0,0,255))
-        self.small_text_layer = TextLayer(128/2, 7, self.game.fonts['medium'], 'center', fill_color=(0,0,0,255))
-        self.points_layer = TextLayer(128/2, 17, self.game.fonts['large_num'], 'center', fill_color=(0,0,0,255))
+        self.large_text_layer = LastTextLayer(128/2, 7, self.game.fonts['large'], 'center', fill_color=(0,0,0,255))
+        self.small_text_layer = LastTextLayer(128/2, 7, self.game.fonts['medium'], 'center', fill_color=(0,0,0,255))
+        self.points_layer = LastTextLayer(128/2, 17, self.game.fonts['large_num'], 'center', fill_color=(0,0,0,255))
+        self.text_layers = [self.large_text_layer, self.small_text_layer, self.points_layer]
+
+        # the layouts are reused, only the text that changed is rendered again
+        self.text_layout = CachedGroupedLayer(128, 32, [self.large_text_layer], opaque=True)
+        self.text_points_layout = CachedGroupedLayer(128, 32, [self.small_text_layer, self.points_layer], opaque=True)
+        self.points_layout = CachedGroupedLayer(128, 32, [self.points_layer], opaque=True)
+        self.renders_at_ball_start = 0
+
+    def mode_started(self):
+        self.renders_at_ball_start = self.num_renders()
 
     def mode_stopped(self):
         self.remove_display()
 
+    def num_renders(self):
+        return sum(layer.renders for layer in self.text_layers)
+
+    def render_count(self):
+        """Return the number of text frames rendered by display() during the current ball,
+           each render allocates the frame of the text, the layouts themselves are not allocated again"""
+        return self.num_renders() - self.renders_at_ball_start
+
     def display(self, text=None, points=None):
-        layers = []
-        if text:
-            text_layer = self.small_text_layer if points is not None else self.large_text_layer
-            text_layer.set_text(text)
-            layers.append(text_layer)
         if points is not None:
             self.points_layer.set_text(self.game.format_points(points))
-            layers.append(self.points_layer)
-        if layers:
-            self.layer = GroupedLayer(128, 32, layers, opaque=True)
+        if text:
+            if points is not None:
+                self.small_text_layer.set_text(text)
+                layout = self.text_points_layout
+            else:
+                self.large_text_layer.set_text(text)
+                layout = self.text_layout
+        else:
+            layout = self.points_layout if points is not None else None
+
+        if layout:
+            self.layer = layout
             self.cancel_delayed('remove_display')
             self.delay('remove_display', None, 3, self.remove_display)
         else:
@@ -1,4 +1,3 @@
-from random import shuffle
 from time import time
 from procgame.game import AdvancedMode
 from crimescenes import CrimeSceneShots
@@ -13,7 +12,7 @@ class CityBlocks(AdvancedMode):
         self.block_war = BlockWar(self, priority + 5)
 
     def reset(self):
-        difficulty = self.game.user_settings['Gameplay']['Block difficulty']
+        difficulty = self.game.settings_snapshot.gameplay.block_difficulty
         if difficulty == 'easy':
             self.level_pick_from = [
                 [2,4], [2,4], [2,4], [2,4],
@@ -76,7 +75,7 @@ class CityBlocks(AdvancedMode):
         # launch another ball for a 2 ball multiball, or up to 4 balls when stacked with Deadworld multiball
         self.game.launch_balls(1, autoplunge=True)
         
-        ball_save_time = self.game.user_settings['Gameplay']['Block War ballsave time']
+        ball_save_time = self.game.settings_snapshot.gameplay.block_war_ballsave_time
         self.game.ball_save_start(time=ball_save_time, now=True, allow_multiple_saves=True)
         self.game.modes.add(self.block_war)
         self.game.update_lamps()
@@ -176,7 +175,7 @@ class CityBlock(CrimeSceneShots):
         else:
             # internally blocks start at 0, on the display blocks start at 1
             current_block = self.game.getPlayerState('current_block')
-            shuffle(self.block_outcome)
+            self.game.random.shuffle(self.block_outcome)
             block_n_outcome = 'Block ' + str(current_block + 1) + ' ' + self.block_outcome[0]
             self.game.sound.play_voice(block_n_outcome)
             self.game.set_status(block_n_outcome.upper())
@@ -195,7 +194,7 @@ class CityBlock(CrimeSceneShots):
                 # the block consists of num_to_pick many targets chosen among the targets listed in pick_from
                 # every selected target needs to be hit once
                 pick_from = self.parent.level_pick_from[current_block]
-                shuffle(pick_from)
+                self.game.random.shuffle(pick_from)
 
                 num_to_pick = self.parent.level_num_shots[current_block]
                 if num_to_pick > len(pick_from):
@@ -219,7 +218,7 @@ class CityBlock(CrimeSceneShots):
         style = styles[self.num_advance_hits]
         self.game.drive_lamp('advanceCrimeLevel', style)
 
-        current_block = self.game.getPlayerState('current_block')
+        current_block = self.game.current_player().state.current_block
         lamp_color = current_block % 4
         for shot in range(0, 5):
             for color in range(0, 4):
@@ -300,7 +299,7 @@ class BlockWar(TimedMode, CrimeSceneShots):
                 self.incr_num_shots()
                 self.game.update_lamps()
 
-                multiplier = self.game.getPlayerState('num_hurry_ups') + 1
+                multiplier = self.game.current_player().state.num_hurry_ups + 1
                 points = 5000 * multiplier
                 self.game.score(points)
 
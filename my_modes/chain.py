@@ -1,4 +1,3 @@
-from random import randint
 from time import time
 from procgame.game import AdvancedMode
 from procgame.sound import CH_SFX
@@ -93,20 +92,20 @@ class Chain(AdvancedMode):
 
     # start a new chain mode after the display becomes available
     def start_chain_mode(self):
-        block_busy_until = self.game.getPlayerState('block_busy_until')
+        state = self.game.current_player().state
         now = time()
-        if block_busy_until > now:
+        if state.block_busy_until > now:
             # wait for block mode to finish talking and/or displaying on the screen
-            self.delay('start_chain_mode', None, block_busy_until - now, self.start_chain_mode)
+            self.delay('start_chain_mode', None, state.block_busy_until - now, self.start_chain_mode)
             return
 
         self.mode = self.modes_remaining[self.modes_remaining_ptr]
-        self.game.setPlayerState('chain_active', True)
+        state.chain_active = True
         self.modes_remaining.remove(self.mode)
         if len(self.modes_remaining) == 0:
-            self.game.setPlayerState('chain_complete', True)
+            state.chain_complete = True
         self.rotate_modes(0)
-        self.game.adjPlayerState('num_chain_features', 1)
+        state.num_chain_features += 1
 
         self.game.base_play.regular_play.state = 'mode'
         self.game.modes.add(self.mode)
@@ -170,7 +169,7 @@ class ChainHurryUp(TimedMode):
                     instructions='Shoot subway', num_shots_required=1)
 
     def mode_started(self):
-        self.mode_time = self.game.user_settings['Gameplay']['Time for Hurry Up']
+        self.mode_time = self.game.settings_snapshot.gameplay.time_for_hurry_up
         super(ChainHurryUp, self).mode_started()
         self.game.coils.tripDropTarget.pulse()
         self.trip_check()
@@ -227,10 +226,10 @@ class ChainFeature(TimedMode):
         self.lamp_name = class_name[0].lower() + class_name[1:]  # lowercase first letter 
 
     def mode_started(self):
-        self.mode_time = self.game.user_settings['Gameplay']['Time per chain feature']
+        self.mode_time = self.game.settings_snapshot.gameplay.time_per_chain_feature
         
         if self.num_shot_options:
-            difficulty = self.game.user_settings['Gameplay']['Chain feature difficulty']
+            difficulty = self.game.settings_snapshot.gameplay.chain_feature_difficulty
             if not difficulty in ['easy', 'medium', 'hard']:
                 difficulty = 'medium'
             self.num_shots_required = self.num_shot_options[difficulty]
@@ -348,7 +347,7 @@ class Sniper(ChainFeature):
 
     def mode_started(self):
         super(Sniper, self).mode_started()
-        time = randint(2, 7)
+        time = self.game.random.randint(2, 7)
         self.delay(name='gunshot', event_type=None, delay=time, handler=self.gunshot)
 
     def update_lamps(self):
@@ -356,7 +355,7 @@ class Sniper(ChainFeature):
 
     def gunshot(self):
         self.game.sound.play_voice('sniper - shot')
-        time = randint(2, 7)
+        time = self.game.random.randint(2, 7)
         self.delay(name='gunshot', event_type=None, delay=time, handler=self.gunshot)
 
     def sw_popperR_active_for_300ms(self, sw):
@@ -457,7 +456,7 @@ class Impersonator(ChainFeature):
 
     def play_sound(self, key):
         # this mode talks all the time, keep quiet if stacked with missile award or multiball
-        if not self.paused and not self.game.getPlayerState('multiball_active'):
+        if not self.paused and not self.game.current_player().state.multiball_active:
             # play voices on top of each other as sound effects
             self.game.sound.play(key, channel=CH_SFX)
 
@@ -473,12 +472,12 @@ class Impersonator(ChainFeature):
         self.delay(name='song_restart', event_type=None, delay=6, handler=self.song_restart)
 
     def boo_restart(self):
-        time = randint(2, 7)
+        time = self.game.random.randint(2, 7)
         self.play_sound('bad impersonator boo')
         self.delay(name='boo_restart', event_type=None, delay=time, handler=self.boo_restart)
 
     def shutup_restart(self):
-        time = randint(2, 7)
+        time = self.game.random.randint(2, 7)
         self.play_sound('bad impersonator shutup')
         self.delay(name='shutup_restart', event_type=None, delay=time, handler=self.shutup_restart)
 
@@ -586,14 +585,14 @@ class Safecracker(ChainFeature):
         super(Safecracker, self).__init__(game, priority, 'Safe Cracker', 'Shoot subway', num_shot_options)
 
     def bad_guys(self):
-        self.delay(name='bad guys', event_type=None, delay=randint(5, 10), handler=self.bad_guys)
+        self.delay(name='bad guys', event_type=None, delay=self.game.random.randint(5, 10), handler=self.bad_guys)
         self.game.sound.play_voice('safecracker bad guys')
 
     def mode_started(self):
         super(Safecracker, self).mode_started()
         self.start_using_drops()
         self.trip_check()
-        self.delay(name='bad guys', event_type=None, delay=randint(10, 20), handler=self.bad_guys)
+        self.delay(name='bad guys', event_type=None, delay=self.game.random.randint(10, 20), handler=self.bad_guys)
 
     def mode_stopped(self):
         super(Safecracker, self).mode_stopped()
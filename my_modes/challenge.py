@@ -1,4 +1,3 @@
-from random import shuffle
 from procgame.dmd import GroupedLayer, TextLayer
 from procgame.game import AdvancedMode
 from crimescenes import CrimeSceneShots
@@ -101,6 +100,7 @@ class ChallengeBase(TimedMode):
         name = self.__class__.__name__
         super(ChallengeBase, self).__init__(game, priority, 0, name, instructions, num_shots_required)
         self.num_balls = num_balls
+        self.ball_save_time_setting = name + ' ballsave time'
 
     def mode_started(self):
         super(ChallengeBase, self).mode_started()
@@ -112,8 +112,7 @@ class ChallengeBase(TimedMode):
         if balls_to_launch > 0:
             self.game.launch_balls(balls_to_launch, autoplunge=True)
 
-        ball_save_time_settings = self.name + ' ballsave time'
-        ball_save_time = self.game.user_settings['Gameplay'].get(ball_save_time_settings, None)
+        ball_save_time = self.game.settings_snapshot.gameplay.get(self.ball_save_time_setting)
         if ball_save_time:
                 self.game.ball_save_start(time=ball_save_time, now=True, allow_multiple_saves=True)
 
@@ -198,7 +197,7 @@ class Fear(DarkJudge):
                     num_shots_required=5, num_balls=1)
 
     def mode_started(self):
-        self.time_for_shot = self.game.user_settings['Gameplay']['Time for Fear shot']
+        self.time_for_shot = self.game.settings_snapshot.gameplay.time_for_fear_shot
         self.mode_time = self.time_for_shot # initial time
         super(Fear, self).mode_started()
         self.mystery_lit = True
@@ -359,8 +358,8 @@ class Death(DarkJudge, CrimeSceneShots):
         self.shot_order = [4, 2, 0, 3, 1] # from easiest to hardest
 
     def mode_started(self):
-        self.time_for_shot = self.game.user_settings['Gameplay']['Time for Death shot']
-        self.mode_time = self.game.user_settings['Gameplay']['Time for Death'] # initial time
+        self.time_for_shot = self.game.settings_snapshot.gameplay.time_for_death_shot
+        self.mode_time = self.game.settings_snapshot.gameplay.time_for_death # initial time
         super(Death, self).mode_started()
         self.shot_timer = self.time_for_shot
         self.active_shots = [1, 1, 1, 1, 1]
@@ -481,7 +480,7 @@ class Celebration(ChallengeBase, CrimeSceneShots):
     def update_lamps(self):
         # rotate 0xFFFF0000 pattern to all 32 bit positions
         lamp_schedules = [(0xFFFF0000 >> d)|(0xFFFF0000 << (32 - d)) & 0xFFFFFFFF for d in range (0, 32)]
-        shuffle(lamp_schedules)
+        self.game.random.shuffle(lamp_schedules)
 
         i = 0
         for lamp in self.game.lamps:
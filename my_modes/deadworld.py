@@ -1,6 +1,7 @@
-from procgame.dmd import GroupedLayer, TextLayer
+from procgame.dmd import TextLayer
 from procgame.game import AdvancedMode, SwitchStop
 from procgame.modes.service import ServiceModeSkeleton
+from layers import CachedGroupedLayer
 
 class Deadworld(AdvancedMode):
     """Controls the Deadworld planet"""
@@ -165,7 +166,7 @@ class DeadworldTest(ServiceModeSkeleton):
         self.globe_layer = TextLayer(1, 9, font, 'left')
         self.arm_layer = TextLayer(1, 17, font, 'left')
         self.magnet_layer = TextLayer(1, 25, font, 'left')
-        self.layer = GroupedLayer(128, 32, [self.title_layer, self.globe_layer, self.arm_layer, self.magnet_layer], opaque=True, fill_color=(0,0,0,255))
+        self.layer = CachedGroupedLayer(128, 32, [self.title_layer, self.globe_layer, self.arm_layer, self.magnet_layer], opaque=True, fill_color=(0,0,0,255))
 
     def reset(self, lamp_style):
         self.globe_state = False
@@ -1,9 +1,11 @@
 # Originally copied from pyprocgame
 # Copyright (c) 2009-2011 Adam Preble and Gerry Stellenberg
 
+from collections import deque
 from procgame.game import AdvancedMode, Mode, SwitchStop
-from procgame.dmd import Frame, FrameLayer, FrameQueueLayer, GroupedLayer, MarkupFrameGenerator, ScriptedLayer, font_named
+from procgame.dmd import Frame, FrameLayer, GroupedLayer, Layer, MarkupFrameGenerator, ScriptedLayer, font_named
 from procgame.highscore import CategoryLogic, EntrySequenceManager
+from layers import ScratchFrames
 
 class JDEntrySequenceManager(EntrySequenceManager):
 
@@ -100,14 +102,14 @@ class JDInitialEntryMode(Mode):
         inits_layer.set_target_position(0, 10)
         self.layer.layers += [inits_layer]
 
-        self.lowerhalf_layer = FrameQueueLayer(opaque=False, hold=True)
-        self.lowerhalf_layer.set_target_position(0, 23)
-        self.layer.layers += [self.lowerhalf_layer]
-
         self.letters = []
         for idx in range(26):
             self.letters += [chr(ord('A')+idx)]
         self.letters += [' ', '.', self.char_back, self.char_done]
+
+        self.lowerhalf_layer = LetterWheelLayer(self.letters, self.letters_font)
+        self.lowerhalf_layer.set_target_position(0, 23)
+        self.layer.layers += [self.lowerhalf_layer]
         self.char_done_index = self.letters.index(self.char_done)
         self.current_letter_index = 0
         self.initials = ''
@@ -123,39 +125,9 @@ class JDInitialEntryMode(Mode):
         self.cancel_delayed('blink cursor')
 
     def animate_to_index(self, new_index, inc=0):
-        letter_spread = 10
-        letter_width = 5
-        if inc < 0:
-            rng = range(inc * letter_spread, 1)
-        elif inc > 0:
-            rng = range(inc * letter_spread)[::-1]
-        else:
-            rng = [0]
-        for x in rng:
-            frame = Frame(width=128, height=9)
-            frame.fill_rect(61,0,8,9,(255,255,255,255))
-            frame.fill_rect(62,1,6,7,(0,0,0,255))
-            for offset in range(-7, 8):
-                index = new_index - offset
-                #print 'Index %d  len=%d' % (index, len(self.letters))
-                if index < 0:
-                    index = len(self.letters) + index
-                elif index >= len(self.letters):
-                    index = index - len(self.letters)
-                self.letters_font.draw(frame, self.letters[index], 128/2 - offset * letter_spread - letter_width/2 + x, 1)
-            # inverse the colors of the current index letter
-            #for x2 in range(61, 69):
-            #    for y2 in range(0, 8):
-            #        frame.set_dot(x2, y2, 15 - frame.get_dot(x2, y2))
-            self.lowerhalf_layer.frames += [frame]
+        self.lowerhalf_layer.slide_to(new_index, inc)
         self.current_letter_index = new_index
 
-        # Prune down the frames list so we don't get too far behind while animating
-        x = 0
-        while len(self.lowerhalf_layer.frames) > 15 and x < (len(self.lowerhalf_layer.frames)-1):
-            del self.lowerhalf_layer.frames[x]
-            x += 2
-
     def draw_initials(self):
         # Draw the middle panel, with the selected initials in order
         self.inits_frame.clear()
@@ -226,3 +198,56 @@ class JDInitialEntryMode(Mode):
     def sw_startButton_active(self, sw):
         self.letter_accept()
         return SwitchStop
+
+
+class LetterWheelLayer(Layer):
+    """The letters around the selected letter, they slide by one letter per step when the selection changes.
+       The wheel is drawn once into a strip, each step copies a window of the strip into a scratch frame."""
+
+    letter_spread = 10
+    letter_width = 5
+    # steps waiting to be shown, the oldest steps are skipped when the letters go by faster than the display
+    max_steps = 15
+
+    def __init__(self, letters, font):
+        super(LetterWheelLayer, self).__init__(opaque=False)
+        self.num_letters = len(letters)
+        # three copies of the wheel so any window around the middle copy is within the strip
+        wheel_width = self.num_letters * self.letter_spread
+        self.strip = Frame(width=3 * wheel_width, height=9)
+        for start in range(0, 3 * wheel_width, wheel_width):
+            for (index, letter) in enumerate(letters):
+                font.draw(self.strip, letter, start + index * self.letter_spread, 1)
+
+        # the box around the selected letter
+        self.box_frame = Frame(width=128, height=9)
+        self.box_frame.fill_rect(61,0,8,9,(255,255,255,255))
+        self.box_frame.fill_rect(62,1,6,7,(0,0,0,255))
+
+        self.scratch = ScratchFrames()
+        self.steps = deque(maxlen=self.max_steps)
+        self.frame = None
+
+    def slide_to(self, new_index, inc=0):
+        if inc < 0:
+            rng = range(inc * self.letter_spread, 1)
+        elif inc > 0:
+            rng = range(inc * self.letter_spread)[::-1]
+        else:
+            rng = [0]
+        self.steps.extend((new_index, x) for x in rng)
+
+    def next_frame(self):
+        # hold the last step
+        if self.steps:
+            (index, x) = self.steps.popleft()
+            self.frame = self.draw_step(index, x)
+        return self.frame
+
+    def draw_step(self, index, x):
+        frame = self.scratch.next(128, 9)
+        Frame.copy_rect(dst=frame, dst_x=0, dst_y=0, src=self.box_frame, src_x=0, src_y=0, width=128, height=9, op='copy')
+        # the selected letter of the middle copy lands in the box when x is 0
+        src_x = (self.num_letters + index) * self.letter_spread - (128//2 - self.letter_width//2) - x
+        Frame.copy_rect(dst=frame, dst_x=0, dst_y=0, src=self.strip, src_x=src_x, src_y=0, width=128, height=9, op='blacksrc')
+        return frame
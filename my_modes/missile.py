@@ -1,5 +1,5 @@
-from random import randint
-from procgame.dmd import GroupedLayer, TextLayer
+from procgame.dmd import TextLayer
+from layers import CachedGroupedLayer
 from timer import Timer
 from videomode import ShootingGallery
 
@@ -20,13 +20,13 @@ class MissileAwardMode(Timer):
         font = self.game.fonts['tiny']
         self.title_layer = TextLayer(128/2, 7, font, 'center').set_text('Missile Award')
         self.value_layer = TextLayer(128/2, 15, font, 'center')
-        self.selection_layer = GroupedLayer(128, 32, [self.title_layer, self.value_layer], opaque=True, fill_color=(0,0,0,255))
+        self.selection_layer = CachedGroupedLayer(128, 32, [self.title_layer, self.value_layer], opaque=True, fill_color=(0,0,0,255))
 
     def evt_player_added(self, player):
         player.setState('missile_award_lit', False)
         player.setState('available_awards', self.initial_awards[:])
 
-        video_mode_setting = self.game.user_settings['Gameplay']['Video mode']
+        video_mode_setting = self.game.settings_snapshot.gameplay.video_mode
         player.setState('video_mode_lit', video_mode_setting != 'off')
 
     def mode_started(self):
@@ -115,7 +115,7 @@ class MissileAwardMode(Timer):
         self.layer = None
 
     def rotate_awards(self):
-        self.current_award_ptr = (self.current_award_ptr + randint(1, 4)) % len(self.available_awards)
+        self.current_award_ptr = (self.current_award_ptr + self.game.random.randint(1, 4)) % len(self.available_awards)
         self.value_layer.set_text(self.available_awards[self.current_award_ptr])
 
     def give_award(self):
@@ -81,7 +81,7 @@ class Multiball(AdvancedMode):
             self.game.deadworld.eject_balls(1)
             self.game.launch_balls(2, autoplunge=True)
 
-        ball_save_time = self.game.user_settings['Gameplay']['Multiball ballsave time']
+        ball_save_time = self.game.settings_snapshot.gameplay.multiball_ballsave_time
         self.game.ball_save_start(time=ball_save_time, now=True, allow_multiple_saves=True)
         self.start_callback()
         self.game.adjPlayerState('multiball_active', 0x1)
@@ -65,8 +65,8 @@ class RegularPlay(AdvancedMode):
             self.setup_next_mode()
 
     def event_ball_started(self):
-        ball_save_time = self.game.user_settings['Gameplay']['New ball ballsave time']
-        repeating_ball_save = self.game.user_settings['Gameplay']['New ball repeating ballsave']
+        ball_save_time = self.game.settings_snapshot.gameplay.new_ball_ballsave_time
+        repeating_ball_save = self.game.settings_snapshot.gameplay.new_ball_repeating_ballsave
         self.game.ball_save_start(time=ball_save_time, now=True, allow_multiple_saves=repeating_ball_save)
         self.game.update_lamps()
 
@@ -185,7 +185,7 @@ class RegularPlay(AdvancedMode):
         if self.mystery_lit:
             self.mystery_lit = False
             self.game.update_lamps()
-            mystery_ball_save_time = self.game.user_settings['Gameplay']['Mystery ballsave time']
+            mystery_ball_save_time = self.game.settings_snapshot.gameplay.mystery_ballsave_time
 
             if self.game.getPlayerState('multiball_active'):
                 if self.game.ball_save.timer > 0:
@@ -196,7 +196,7 @@ class RegularPlay(AdvancedMode):
                     self.game.ball_save_start(time=mystery_ball_save_time, now=True, allow_multiple_saves=True)
 
             elif self.game.getPlayerState('chain_active'):
-                mystery_feature_add_time = self.game.user_settings['Gameplay']['Mystery feature add time']
+                mystery_feature_add_time = self.game.settings_snapshot.gameplay.mystery_feature_add_time
                 self.game.set_status('+' + str(mystery_feature_add_time) + 'SEC TIMER')
                 self.chain.mode.add_time(10)
             else:
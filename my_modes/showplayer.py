@@ -0,0 +1,59 @@
+from procgame.game import AdvancedMode
+
+class CompiledShowPlayer(AdvancedMode):
+    """Plays the compiled lampshows in place of the lamp controller of the framework.
+       A lamp receives a new schedule when its pattern changes instead of every second of the show."""
+
+    def __init__(self, game, priority, shows, lamp_controller):
+        super(CompiledShowPlayer, self).__init__(game, priority, AdvancedMode.System)
+        self.shows = shows
+        # the framework controller still plays the shows that were not compiled
+        self.lamp_controller = lamp_controller
+        self.show = None
+        self.repeat = False
+        self.callback = None
+        self.endless = set()
+        self.commands_sent = 0
+
+    def play_show(self, key, repeat=False, callback=None):
+        if key not in self.shows:
+            self.lamp_controller.play_show(key, repeat, callback)
+            return
+        self.stop_show()
+        self.show = self.shows[key]
+        self.repeat = repeat
+        self.callback = callback
+        self.play_loop(True)
+
+    def play_loop(self, first_loop):
+        for (second, commands) in self.show.commands(first_loop, self.repeat):
+            self.delay(name='lampshow', event_type=None, delay=second, handler=self.send, param=commands)
+        self.delay(name='lampshow', event_type=None, delay=self.show.num_seconds, handler=self.loop_ended)
+
+    def send(self, commands):
+        for (kind, name, word, cycle_seconds) in commands:
+            driver = self.game.coils[name] if kind == 'coil' else self.game.lamps[name]
+            driver.schedule(schedule=word, cycle_seconds=cycle_seconds, now=False)
+            if cycle_seconds == 0:
+                self.endless.add(driver)
+        self.commands_sent += len(commands)
+
+    def loop_ended(self):
+        if self.repeat:
+            self.play_loop(False)
+        else:
+            callback = self.callback
+            self.show = None
+            self.callback = None
+            if callback:
+                callback()
+
+    def stop_show(self):
+        self.cancel_delayed('lampshow')
+        # the schedules of the other drivers run out by themselves
+        for driver in self.endless:
+            driver.disable()
+        self.endless = set()
+        self.show = None
+        self.callback = None
+        self.lamp_controller.stop_show()
@@ -35,7 +35,7 @@ class JDSwitchMonitor(SwitchMonitor):
         super(JDSwitchMonitor, self).sw_startButton_active(sw)
 
     def check_reset(self, min_ball):
-        allow_restart = self.game.user_settings['Machine']['Allow restarts']
+        allow_restart = self.game.settings_snapshot.machine.allow_restarts
         if self.game.ball >= min_ball and allow_restart:
             self.game.safe_reset()
             return SwitchStop
@@ -1,5 +1,6 @@
-from procgame.dmd import GroupedLayer, ScriptedLayer, TextLayer
+from procgame.dmd import ScriptedLayer, TextLayer
 from procgame.game import AdvancedMode
+from layers import CachedGroupedLayer, LastTextLayer
 
 class Timer(AdvancedMode):
     """timer for a timed mode"""
@@ -71,18 +72,19 @@ class TimedMode(Timer):
 
         intro_name_layer = TextLayer(128/2, 7, font_large, 'center').set_text(name)
         intro_instruct_layer = TextLayer(128/2, 25, font_small, 'center').set_text(instructions)
-        intro_page_layer = GroupedLayer(128, 32, [intro_name_layer, intro_instruct_layer])
+        intro_page_layer = CachedGroupedLayer(128, 32, [intro_name_layer, intro_instruct_layer])
         script = [{'seconds':1, 'layer':intro_name_layer}, {'seconds':3, 'layer':intro_page_layer}]
         self.intro_layer = ScriptedLayer(width=128, height=32, script=script, hold=True, opaque=True)
         self.intro_duration = self.intro_layer.duration() - 1.0/30.0
 
         self.countdown_layer = TextLayer(127, 1, font_small, 'right')
         self.name_layer = TextLayer(1, 1, font_small, 'left').set_text(name)
-        self.score_layer = TextLayer(128/2, 10, font_num, 'center')
+        # the score is set on every tick but it rarely changes
+        self.score_layer = LastTextLayer(128/2, 10, font_num, 'center')
         self.status_layer = TextLayer(128/2, 26, font_small, 'center')
         layers = [animationLayer] if animationLayer else []
         layers += [self.countdown_layer, self.name_layer, self.score_layer, self.status_layer]
-        self.mode_layer = GroupedLayer(128, 32, layers, opaque=True)
+        self.mode_layer = CachedGroupedLayer(128, 32, layers, opaque=True)
 
     def mode_started(self):
         self.intro_layer.reset()
@@ -1,54 +1,83 @@
-from random import randint, shuffle
-from procgame.dmd import ExpandTransition, Frame, FrameLayer, GroupedLayer
+from procgame.dmd import Frame, FrameLayer, GroupedLayer
 from procgame.game import SwitchStop
+from layers import ScratchExpandTransition
 from timer import TimedMode
 
 class ShootingGallery(TimedMode):
     def __init__(self, game, priority):
-        self.cow_mode = game.user_settings['Gameplay']['Video mode'] == 'cow'
+        self.cow_mode = game.settings_snapshot.gameplay.video_mode == 'cow'
         instructions = 'Shoot mean cows' if self.cow_mode else 'Shoot all enemies'
         super(ShootingGallery, self).__init__(game, priority, mode_time=0, name='Video Mode', instructions=instructions)
         self.on_complete = None
 
-    def mode_started(self):
-        super(ShootingGallery, self).mode_started()
-        self.game.enable_flippers(False)
-        self.success = False
-        self.state = 'intro'
-        self.scope_pos = 0
-        self.num_enemies = 0
-        self.num_enemies_shot = 0
-        self.num_enemies_required = self.game.user_settings['Gameplay']['Video mode enemies']
-        self.speed_factor = 1
-        self.targets = ['empty'] * 4
-
         if self.cow_mode:
             # family friendly option
             self.enemy = 'Mean Cow'
             self.enemies = 'Mean Cows'
             self.bad_guy_shot = 'moo'
-            cows_anim = self.game.animations['cows']
-            image_frames = cows_anim.frames[0].create_frames_from_grid(2, 1)
-            self.all_friends = [image_frames[0]] * 4
-            self.all_enemies = [image_frames[1]] * 4
         else:
             # default option
             self.enemy = 'Enemy'
             self.enemies = 'Enemies'
             self.bad_guy_shot = 'bad guy shot'
+
+        # the sprite sheets are lazy animations, they are sliced the first time the video mode starts
+        self.all_friends = None
+        self.all_enemies = None
+
+        self.target_layers = [self.new_frame_layer(True) for unused in range(0, 4)]
+        self.scope_layer = self.new_frame_layer()
+        self.bullet_layers = [self.new_frame_layer() for unused in range(0, 4)]
+        graphic_layers = self.target_layers + [self.scope_layer] + self.bullet_layers
+        self.gallery_layer = GroupedLayer(128, 32, graphic_layers, opaque=True)
+
+    def slice_sprites(self):
+        if self.cow_mode:
+            cows_anim = self.game.animations['cows']
+            image_frames = self.placed_frames(cows_anim.frames[0].create_frames_from_grid(2, 1))
+            self.all_friends = [image_frames[0]] * 4
+            self.all_enemies = [image_frames[1]] * 4
+        else:
             gallery_anim = self.game.animations['jdpeople']
-            image_frames = gallery_anim.frames[0].create_frames_from_grid(6, 2)
+            image_frames = self.placed_frames(gallery_anim.frames[0].create_frames_from_grid(6, 2))
             self.all_enemies = image_frames[0:6]
             self.all_friends = image_frames[6:12]
 
-        self.available_friends = self.all_friends[:]
-        self.available_enemies = self.all_enemies[:]
-        shuffle(self.available_friends)
-        shuffle(self.all_enemies)
-
         self.scope_frames = self.game.animations['scopeandshot'].frames[0:4]
         self.shot_frames = self.game.animations['scopeandshot'].frames[4:8]
 
+    def placed_frames(self, sprites):
+        """Return for every sprite the 4 full screen frames with the sprite in the slot of each position"""
+        targets = []
+        for sprite in sprites:
+            frames = []
+            for position in range(0, 4):
+                frame = Frame(128, 32)
+                Frame.copy_rect(dst=frame, dst_x=position*32, dst_y=0, src=sprite, src_x=0, src_y=0, width=32, height=32, op='blacksrc')
+                frames.append(frame)
+            targets.append(frames)
+        return targets
+
+    def mode_started(self):
+        super(ShootingGallery, self).mode_started()
+        self.game.enable_flippers(False)
+        self.success = False
+        self.state = 'intro'
+        self.scope_pos = 0
+        self.num_enemies = 0
+        self.num_enemies_shot = 0
+        self.num_enemies_required = self.game.settings_snapshot.gameplay.video_mode_enemies
+        self.speed_factor = 1
+        self.targets = ['empty'] * 4
+
+        if self.all_friends is None:
+            self.slice_sprites()
+
+        self.available_friends = self.all_friends[:]
+        self.available_enemies = self.all_enemies[:]
+        self.game.random.shuffle(self.available_friends)
+        self.game.random.shuffle(self.available_enemies)
+
         self.delay(name='callout', event_type=None, delay=1, handler=self.callout)
 
     def callout(self):
@@ -61,12 +90,10 @@ class ShootingGallery(TimedMode):
     def intro_ended(self):
         self.state = 'active'
 
-        self.target_layers = [self.new_frame_layer(True) for unused in range(0, 4)]
-        self.scope_layer = self.new_frame_layer()
-        self.bullet_layers = [self.new_frame_layer() for unused in range(0, 4)]
-
-        graphic_layers = self.target_layers + [self.scope_layer] + self.bullet_layers
-        self.layer = GroupedLayer(128, 32, graphic_layers, opaque=True)
+        for layer in self.target_layers + self.bullet_layers:
+            layer.frame = None
+            layer.blink_frames = 0
+        self.layer = self.gallery_layer
 
         # Add the first target after 1 second.
         self.delay(name='add_target', event_type=None, delay=1, handler=self.add_target)
@@ -76,7 +103,7 @@ class ShootingGallery(TimedMode):
         frame_layer = FrameLayer()
         frame_layer.composite_op = 'blacksrc'
         if transition:
-            frame_layer.transition = ExpandTransition()
+            frame_layer.transition = ScratchExpandTransition()
         return frame_layer
 
     def add_target(self):
@@ -88,11 +115,11 @@ class ShootingGallery(TimedMode):
                 self.speed_factor += 1
 
             # Find the first empty position starting with the random start_index.
-            start_index = randint(0, 3)
+            start_index = self.game.random.randint(0, 3)
             for i in range(0, 3):
                 position = (i + start_index) % 4
                 if self.targets[position] == 'empty':
-                    target_type = randint(0, 1)
+                    target_type = self.game.random.randint(0, 1)
                     if target_type:
                         self.show_enemy(position)
                     else:
@@ -114,11 +141,9 @@ class ShootingGallery(TimedMode):
         self.bullet_layers[position].frame = None # remove empty shot if applicable
         # We never show the same friend or enemy on the screen more than once
         self.targets[position] = target_type
-        target_frame = available_targets.pop()
-        new_frame = Frame(128, 32)
-        Frame.copy_rect(dst=new_frame, dst_x=position*32, dst_y=0, src=target_frame, src_x=0, src_y=0, width=32, height=32, op='blacksrc')
-        self.target_layers[position].original_frame = target_frame
-        self.target_layers[position].frame = new_frame
+        target_frames = available_targets.pop()
+        self.target_layers[position].target_frames = target_frames
+        self.target_layers[position].frame = target_frames[position]
         self.target_layers[position].transition.in_out = 'in'
         self.target_layers[position].transition.start()
 
@@ -132,8 +157,8 @@ class ShootingGallery(TimedMode):
 
     def make_available(self, position):
         available_targets = self.available_friends if self.targets[position] == 'friend' else self.available_enemies
-        available_targets.append(self.target_layers[position].original_frame)
-        shuffle(available_targets)
+        available_targets.append(self.target_layers[position].target_frames)
+        self.game.random.shuffle(available_targets)
         self.targets[position] = 'empty'
 
     def sw_flipperLwL_active(self, sw):
@@ -218,7 +243,7 @@ class ShootingGallery(TimedMode):
         text = str(self.num_enemies_shot) + ' ' + (self.enemy if self.num_enemies_shot == 1 else self.enemies)
         points = 5000 * self.num_enemies_shot
         if self.success:
-            points = max(points, self.game.user_settings['Gameplay']['Video mode completion'])
+            points = max(points, self.game.settings_snapshot.gameplay.video_mode_completion)
         self.game.score(points)
         self.game.base_play.display(text, points)
 
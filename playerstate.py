@@ -0,0 +1,70 @@
+"""Player state stored in a record with a slot per key instead of a dictionary.
+
+The keys are declared once in PLAYER_STATE_KEYS, they are the keys initialized by the evt_player_added
+handlers of my_modes. The rules keep using getState()/setState() and the getPlayerState() family,
+the hot paths can read and write the record directly: self.game.current_player().state.current_block
+tests/test_playerstate.py checks the keys used by the game are declared.
+"""
+
+import logging
+from procgame.game import Player
+
+PLAYER_STATE_KEYS = (
+    # BasePlay
+    'supergame', 'total_extra_balls', 'extra_balls_lit', 'multiball_active', 'bonus_x', 'hold_bonus_x',
+    # Chain
+    'modes_remaining', 'modes_remaining_ptr', 'chain_active', 'chain_complete', 'num_chain_features',
+    # CityBlocks
+    'current_block', 'num_blocks', 'blocks_complete', 'block_targets', 'block_busy_until', 'num_hurry_ups',
+    # Multiball
+    'num_balls_locked', 'num_locks_lit', 'multiball_played', 'multiball_jackpot_collected',
+    # MissileAwardMode
+    'missile_award_lit', 'available_awards', 'video_mode_lit',
+    # UltimateChallenge
+    'challenge_mode', 'num_dark_judges',
+    # RegularPlay
+    'mystery_lit',
+    # Combos
+    'best_outer_loops', 'best_inner_loops',
+    # set by the tilt mode of the framework
+    'warnings_remaining',
+)
+
+KNOWN_KEYS = frozenset(PLAYER_STATE_KEYS)
+
+
+class PlayerState(object):
+    __slots__ = PLAYER_STATE_KEYS
+
+
+class JDPlayer(Player):
+    """A player whose state keys are declared in PLAYER_STATE_KEYS.
+       An unknown key is reported once per player and kept in the state_tracking dictionary of the framework."""
+
+    logger = logging.getLogger('game.playerstate')
+
+    def __init__(self, name):
+        super(JDPlayer, self).__init__(name)
+        self.state = PlayerState()
+        self.reported_keys = set()
+
+    def getState(self, key, default=None):
+        try:
+            return getattr(self.state, key)
+        except AttributeError:
+            # a declared key that was not set yet, or an unknown key
+            if key not in KNOWN_KEYS:
+                self.report_unknown_key(key)
+            return self.state_tracking.get(key, default)
+
+    def setState(self, key, value):
+        try:
+            setattr(self.state, key, value)
+        except AttributeError:
+            self.report_unknown_key(key)
+            self.state_tracking[key] = value
+
+    def report_unknown_key(self, key):
+        if key not in self.reported_keys:
+            self.reported_keys.add(key)
+            self.logger.warning('Player state key %s is not declared in PLAYER_STATE_KEYS', key)
@@ -0,0 +1,59 @@
+"""Frozen copy of the user settings read by the rules.
+
+The sections and the settings are attributes named after them in lower case, the other characters
+replaced by underscores: self.game.settings_snapshot.gameplay.time_per_chain_feature
+A value of the wrong type is converted to the type of its default in game_default_settings.yaml,
+or replaced by the default when it cannot be converted.
+"""
+
+from collections import namedtuple
+import logging
+import re
+
+logger = logging.getLogger('game.settings')
+
+TEXT_TYPES = (type(u''), type(''))
+
+
+def attribute_name(name):
+    return re.sub('[^0-9a-zA-Z]+', '_', name).strip('_').lower()
+
+
+def checked_value(value, default):
+    if default is None or value is None or isinstance(value, type(default)):
+        return value
+    if isinstance(default, TEXT_TYPES) and isinstance(value, TEXT_TYPES):
+        return value
+    if isinstance(default, bool):
+        if str(value).lower() in ['true', 'false']:
+            return str(value).lower() == 'true'
+        raise ValueError(value)
+    if isinstance(default, (int, float)):
+        return type(default)(value)
+    raise ValueError(value)
+
+
+def create_section(section, values, templates):
+    """Return a namedtuple of the settings of one section.
+       The settings also remain available by their original names through get()."""
+    names = sorted(values)
+    for name in names:
+        default = (templates.get(name) or {}).get('default')
+        try:
+            values[name] = checked_value(values[name], default)
+        except (TypeError, ValueError):
+            logger.error('Setting %s/%s has the invalid value %r, using the default %r', section, name, values[name], default)
+            values[name] = default
+
+    fields = [attribute_name(name) for name in names]
+    section_class = namedtuple(attribute_name(section).title().replace('_', '') + 'Settings', fields, rename=True)
+    section_class.get = lambda self, name, default=None: values.get(name, default)
+    return section_class(*[values[name] for name in names])
+
+
+def create_settings_snapshot(user_settings, templates):
+    """Return a namedtuple of the sections of the user settings"""
+    sections = sorted(user_settings)
+    snapshot_class = namedtuple('SettingsSnapshot', [attribute_name(section) for section in sections], rename=True)
+    return snapshot_class(*[create_section(section, dict(user_settings[section]), templates.get(section) or {})
+                            for section in sections])
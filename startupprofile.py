@@ -0,0 +1,116 @@
+from contextlib import contextmanager
+import json
+import timeit
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+try:
+    import resource
+except ImportError:
+    # not available on Windows
+    resource = None
+
+
+def resident_bytes():
+    """Return the resident memory of the process, or its peak when psutil is not installed, None if unknown"""
+    if psutil:
+        return psutil.Process().memory_info().rss
+    if resource:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    return None
+
+
+class StartupTimeline(object):
+    """Wall time and memory of the phases of the game startup, phases can be nested.
+       The timeline ends with the first frame, the phases started later are not recorded.
+       A timeline that is not enabled records nothing."""
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.clock = timeit.default_timer
+        self.start = self.clock()
+        self.phases = []
+        self.depth = 0
+        self.end = None
+        self.constructors = {}
+        self.constructing = set()
+
+    @contextmanager
+    def phase(self, name):
+        if not self.enabled or self.end is not None:
+            yield
+            return
+
+        # [name, depth, start, end, memory at start, memory at end]
+        record = [name, self.depth, self.clock() - self.start, None, resident_bytes(), None]
+        self.phases.append(record)
+        self.depth += 1
+        try:
+            yield
+        finally:
+            self.depth -= 1
+            record[3] = self.clock() - self.start
+            record[5] = resident_bytes()
+
+    def finish(self, name):
+        """Record the end of the startup"""
+        if self.enabled and self.end is None:
+            self.end = (name, self.clock() - self.start, resident_bytes())
+
+    def profile_constructors(self, base_class):
+        """Make a phase of the constructor of every subclass of base_class until restore_constructors() is called"""
+        classes = [base_class]
+        while classes:
+            cls = classes.pop()
+            classes.extend(cls.__subclasses__())
+            if cls is not base_class and '__init__' in cls.__dict__:
+                self.constructors[cls] = cls.__dict__['__init__']
+                cls.__init__ = self.timed_constructor(cls.__dict__['__init__'])
+
+    def restore_constructors(self):
+        for (cls, constructor) in self.constructors.items():
+            cls.__init__ = constructor
+        self.constructors = {}
+
+    def timed_constructor(self, constructor):
+        def timed(obj, *args, **kwargs):
+            # only the outermost constructor is a phase, not the constructors of the base classes it calls
+            if id(obj) in self.constructing:
+                return constructor(obj, *args, **kwargs)
+            self.constructing.add(id(obj))
+            try:
+                with self.phase(type(obj).__name__):
+                    return constructor(obj, *args, **kwargs)
+            finally:
+                self.constructing.discard(id(obj))
+        return timed
+
+    def report(self):
+        lines = ['%10s %10s %10s  %s' % ('total ms', 'self ms', 'memory MB', 'phase')]
+        for (index, (name, depth, start, end, memory_start, memory_end)) in enumerate(self.phases):
+            duration = (end or start) - start
+            children = sum((phase[3] or phase[2]) - phase[2] for phase in self.phases[index + 1:]
+                           if phase[1] == depth + 1 and phase[2] < (end or start))
+            memory = '%+10.1f' % ((memory_end - memory_start) / 1e6) if memory_end is not None and memory_start is not None else '%10s' % '?'
+            lines.append('%10.1f %10.1f %s  %s%s' % (1e3 * duration, 1e3 * (duration - children), memory, '  ' * depth, name))
+        if self.end:
+            (name, when, memory) = self.end
+            lines.append('%10.1f %10s %10s  %s%s' % (1e3 * when, '', '%.1f' % (memory / 1e6) if memory else '?', name,
+                                                      ' (total time and resident memory)'))
+        return '\n'.join(lines)
+
+    def write_chrome_trace(self, path):
+        """Write the timeline in the Chrome trace event format, open it with chrome://tracing or Perfetto"""
+        events = []
+        for (name, depth, start, end, memory_start, memory_end) in self.phases:
+            events.append({'name': name, 'ph': 'X', 'pid': 1, 'tid': 1, 'ts': 1e6 * start, 'dur': 1e6 * ((end or start) - start)})
+            for (when, memory) in [(start, memory_start), (end, memory_end)]:
+                if when is not None and memory is not None:
+                    events.append({'name': 'memory', 'ph': 'C', 'pid': 1, 'ts': 1e6 * when, 'args': {'MB': memory / 1e6}})
+        if self.end:
+            events.append({'name': self.end[0], 'ph': 'i', 's': 'g', 'pid': 1, 'tid': 1, 'ts': 1e6 * self.end[1]})
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
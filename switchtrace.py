@@ -0,0 +1,75 @@
+import os
+import struct
+import time
+
+# header: magic, format version, wall clock time when the trace started, seed of the random generator of the game,
+# number of switches closed when the game was built, followed by their P-ROC switch numbers
+HEADER = struct.Struct('<4sBdQH')
+SWITCH_NUMBER = struct.Struct('<H')
+MAGIC = b'JD2T'
+VERSION = 2
+
+# record: milliseconds since the trace started, P-ROC switch number, P-ROC event type
+RECORD = struct.Struct('<IHB')
+
+
+class SwitchRecorder(object):
+    """Writes the switch events received by the game to a compact binary trace file.
+       Together with the seed of the random generator of the game and the switch states the game was built with,
+       the trace is enough to replay the session. The trace starts with the first pass of the run loop,
+       the time spent building the game is not part of it since the replay builds the game in no time."""
+
+    def __init__(self, path, random_seed, closed_switches, flush_interval=1.0):
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        self.file = open(path, 'wb')
+        self.random_seed = random_seed
+        self.closed_switches = closed_switches
+        self.flush_interval = flush_interval
+        self.start_time = None
+        self.last_flush = None
+
+    def start(self, now):
+        """Start the trace clock, this does nothing once the trace is started"""
+        if self.start_time is None:
+            self.start_time = now
+            self.last_flush = now
+            self.file.write(HEADER.pack(MAGIC, VERSION, now, self.random_seed, len(self.closed_switches)))
+            for switch_number in self.closed_switches:
+                self.file.write(SWITCH_NUMBER.pack(switch_number))
+
+    def record(self, now, switch_number, event_type):
+        self.start(now)
+        self.file.write(RECORD.pack(int(round(1000 * (now - self.start_time))), switch_number, event_type))
+        # don't lose much of the session if the machine is switched off
+        if now - self.last_flush >= self.flush_interval:
+            self.last_flush = now
+            self.file.flush()
+
+    def close(self):
+        self.start(time.time())
+        self.file.close()
+
+
+class SwitchTrace(object):
+    """A switch trace read back from a file, the events are (seconds since start, switch number, event type)
+       closed_switches holds the numbers of the switches that were closed when the game was built."""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            data = f.read()
+        (magic, version) = struct.unpack_from('<4sB', data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(path + ' is not a switch trace of version %d' % VERSION)
+        (magic, version, self.start_time, self.random_seed, num_closed) = HEADER.unpack_from(data)
+        self.closed_switches = [SWITCH_NUMBER.unpack_from(data, HEADER.size + index * SWITCH_NUMBER.size)[0]
+                                for index in range(num_closed)]
+        records_start = HEADER.size + num_closed * SWITCH_NUMBER.size
+
+        # ignore a partial record at the end of the file
+        num_records = (len(data) - records_start) // RECORD.size
+        self.events = []
+        for index in range(num_records):
+            (ms, switch_number, event_type) = RECORD.unpack_from(data, records_start + index * RECORD.size)
+            self.events.append((ms / 1000.0, switch_number, event_type))
@@ -0,0 +1,5 @@
+"""Behavior checks of the game.
+
+Run from the game directory: python -m unittest discover tests
+The checks needing procgame are skipped when it is not installed.
+"""
@@ -0,0 +1,106 @@
+import os
+import unittest
+
+try:
+    from procgame.dmd import Frame
+    from animations import AnimationCache, LazyAnimation, preload_animations
+except ImportError:
+    Frame = None
+
+game_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def lazy_animation(cache, key):
+    animation = LazyAnimation({'key': key}, key + '.dmd', cache, missing=None)
+    # 4 frames of 10x10 dots, the decodes are counted
+    def decode():
+        animation.__dict__['decodes'] = animation.__dict__.get('decodes', 0) + 1
+        return [Frame(10, 10) for index in range(4)]
+    animation.__dict__['decode'] = decode
+    return animation
+
+
+@unittest.skipIf(Frame is None, 'procgame is not installed')
+class LazyAnimationTest(unittest.TestCase):
+
+    def test_decoded_on_first_use(self):
+        animation = lazy_animation(AnimationCache(), 'a')
+        self.assertFalse(animation.loaded)
+        self.assertEqual(len(animation.frames), 4)
+        self.assertEqual((animation.decodes, animation.cache.num_bytes), (1, 400))
+
+    def test_least_recently_shown_is_unloaded(self):
+        cache = AnimationCache(budget=800)
+        (first, second, third) = [lazy_animation(cache, key) for key in 'abc']
+        first.load()
+        second.load()
+        first.next_frame()
+        third.load()
+        self.assertEqual((first.loaded, second.loaded, third.loaded), (True, False, True))
+        self.assertEqual((cache.num_bytes, cache.evictions), (800, 1))
+
+    def test_reading_attributes_does_not_touch(self):
+        cache = AnimationCache(budget=800)
+        (first, second, third) = [lazy_animation(cache, key) for key in 'abc']
+        first.load()
+        second.load()
+        first.frame_pointer
+        third.load()
+        self.assertEqual((first.loaded, second.loaded), (False, True))
+
+    def test_no_budget_keeps_everything(self):
+        cache = AnimationCache()
+        animations = [lazy_animation(cache, key) for key in 'abc']
+        for animation in animations:
+            animation.next_frame()
+        self.assertEqual(list(cache.sizes), animations)
+        self.assertTrue(all(animation.loaded for animation in animations))
+
+    def test_playback_goes_on_after_an_unload(self):
+        cache = AnimationCache(budget=400)
+        (shown, other) = [lazy_animation(cache, key) for key in 'ab']
+        shown.frame_listeners = []
+        shown.next_frame()
+        shown.next_frame()
+        other.load()
+        self.assertFalse(shown.loaded)
+        shown.next_frame()
+        self.assertEqual((shown.decodes, shown.frame_pointer), (2, 3))
+        self.assertEqual(shown.frame_listeners, [])
+
+
+class MissingAnimation(object):
+
+    def __init__(self):
+        self.frame = Frame(1, 1)
+
+
+@unittest.skipIf(Frame is None, 'procgame is not installed')
+class PreloadTest(unittest.TestCase):
+
+    def preload(self, num_processes):
+        cache = AnimationCache()
+        missing = self.missing = MissingAnimation()
+        animations = {}
+        for (key, name) in [('splash', 'Splash.dmd'), ('gone', 'gone.dmd'), ('splash_again', 'Splash.dmd')]:
+            animations[key] = LazyAnimation({'key': key}, os.path.join(game_path, 'assets/dmd', name), cache, missing)
+        progress = []
+        preload_animations(animations, ['splash', 'gone', 'splash_again'], lambda *args: progress.append(args), num_processes)
+        return (animations, progress)
+
+    def test_worker_processes_decode_like_the_game(self):
+        (animations, progress) = self.preload(0)
+        (pool_animations, pool_progress) = self.preload(2)
+        self.assertEqual(pool_progress, progress)
+        self.assertEqual(progress, [(1, 3, 'splash'), (2, 3, 'gone'), (3, 3, 'splash_again')])
+        for key in ['splash', 'splash_again']:
+            self.assertTrue(pool_animations[key].loaded)
+            self.assertEqual([frame.get_data() for frame in pool_animations[key].frames],
+                             [frame.get_data() for frame in animations[key].frames])
+        # a file that cannot be read falls back to the missing frame in both cases
+        self.assertEqual(pool_animations['gone'].frames, [self.missing.frame])
+        self.assertEqual(len(animations['gone'].frames), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from assetprefetch import AssetPrefetch, asset_paths
+
+game_config = {'dmd_path': 'dmd/', 'font_path': ['fonts/', 'more_fonts/'], 'lampshow_path': 'shows/',
+               'sound_path': 'sound/', 'music_dir': 'music/', 'sfx_dir': 'sfx/', 'voice_dir': 'voice/'}
+
+asset_list = {
+    'Animations': [{'key': 'missing', 'file': 'missing.png'}],
+    'Fonts': {'DMDFonts': [{'key': 'default', 'file': 'Font07x5.dmd'}]},
+    'LampShows': [{'key': 'jackpot', 'file': 'jackpot.lampshow'}],
+    'Audio': {
+        'Music': [{'key': 'mode', 'file': 'solo.aif'}, {'key': 'pursuit', 'file': 'solo.aif'}],
+        'Effects': [{'key': 'sling', 'file': 'click.wav'}],
+        'Voice': [{'key': 'crime', 'file': 'crime 1.wav'}, {'key': 'crime', 'file': 'crime 2.wav'}],
+    },
+}
+
+
+class AssetPrefetchTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_paths_of_every_group(self):
+        paths = asset_paths(game_config, asset_list)
+        self.assertEqual([path.replace(os.sep, '/') for path in paths], [
+            'dmd/missing.png', 'shows/jackpot.lampshow',
+            'sound/music/solo.aif', 'sound/sfx/click.wav', 'sound/voice/crime 1.wav', 'sound/voice/crime 2.wav'])
+
+    def test_fonts_are_searched_in_the_font_path(self):
+        font_directory = os.path.join(self.directory, 'more_fonts')
+        os.mkdir(font_directory)
+        open(os.path.join(font_directory, 'Font07x5.dmd'), 'wb').close()
+        config = dict(game_config, font_path=[os.path.join(self.directory, 'fonts'), font_directory])
+        self.assertIn(os.path.join(font_directory, 'Font07x5.dmd'), asset_paths(config, asset_list))
+
+    def test_reads_every_file(self):
+        paths = []
+        for (index, size) in enumerate([10, 3000, 0]):
+            path = os.path.join(self.directory, 'asset%d' % index)
+            with open(path, 'wb') as f:
+                f.write(b'x' * size)
+            paths.append(path)
+        # a file that cannot be read is left to the loader
+        paths.append(os.path.join(self.directory, 'missing.wav'))
+        self.assertEqual(AssetPrefetch(paths, num_threads=2).finish(), 3010)
+
+    def test_disabled(self):
+        self.assertEqual(AssetPrefetch(['missing.wav'], num_threads=0).finish(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+from collections import OrderedDict
+import datetime
+import os
+import shutil
+import tempfile
+import unittest
+import yaml
+from gamedatajournal import GameDataJournal
+
+
+class GameDataJournalTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.yaml_path = os.path.join(self.directory, 'game_user_data.yaml')
+        self.journal_path = os.path.join(self.directory, 'game_user_data.journal')
+        self.write_yaml(OrderedDict([('Audits', OrderedDict([('Games Played', 3), ('Balls Played', 9)])),
+                                     ('ClassicHighScoreData', [OrderedDict([('inits', 'JD'), ('score', 1000000)])])]))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write_yaml(self, data):
+        with open(self.yaml_path, 'w') as f:
+            yaml.safe_dump(dict((key, dict(value) if isinstance(value, dict) else [dict(item) for item in value])
+                                for (key, value) in data.items()), f)
+
+    def read_yaml(self):
+        with open(self.yaml_path) as f:
+            return yaml.safe_load(f)
+
+    def boot(self):
+        """Load the game data like the game does at startup, without the compaction"""
+        game_data = self.read_yaml()
+        journal = GameDataJournal(self.journal_path)
+        journal.replay(game_data)
+        return (journal, game_data)
+
+    def test_replay_restores_the_appended_sections(self):
+        (journal, game_data) = self.boot()
+        game_data['Audits']['Games Played'] = 4
+        journal.append(game_data)
+        journal.append(game_data)
+        self.assertEqual(journal.num_records, 1)
+
+        (journal, replayed) = self.boot()
+        self.assertEqual(replayed['Audits']['Games Played'], 4)
+        self.assertEqual(replayed['ClassicHighScoreData'], [{'inits': 'JD', 'score': 1000000}])
+
+    def test_compaction_writes_plain_yaml_and_empties_the_journal(self):
+        (journal, game_data) = self.boot()
+        game_data['ClassicHighScoreData'][0]['inits'] = 'DREDD'
+        journal.append(game_data)
+
+        (journal, game_data) = self.boot()
+        journal.compact(game_data, self.yaml_path)
+        self.assertEqual(os.path.getsize(self.journal_path), 0)
+        with open(self.yaml_path) as f:
+            text = f.read()
+        # the strings read back from JSON and the OrderedDict are written without a Python tag
+        self.assertNotIn('!!', text)
+        data = yaml.safe_load(text)
+        self.assertEqual(data['ClassicHighScoreData'], [{'inits': 'DREDD', 'score': 1000000}])
+        self.assertIs(type(data['ClassicHighScoreData'][0]['inits']), str)
+        self.assertEqual(self.boot()[1], data)
+
+    def test_incomplete_last_record_is_ignored(self):
+        (journal, game_data) = self.boot()
+        game_data['Audits']['Games Played'] = 4
+        journal.append(game_data)
+        game_data['Audits']['Games Played'] = 5
+        journal.append(game_data)
+        with open(self.journal_path, 'rb+') as f:
+            f.truncate(os.path.getsize(self.journal_path) - 5)
+        self.assertEqual(self.boot()[1]['Audits']['Games Played'], 4)
+
+    def test_value_json_cannot_hold_is_refused(self):
+        (journal, game_data) = self.boot()
+        game_data['Audits']['Last Game'] = datetime.date(2026, 1, 1)
+        self.assertRaises(TypeError, journal.append, game_data)
+        self.assertFalse(os.path.exists(self.journal_path))
+
+        game_data['Audits']['Last Game'] = (1, 2)
+        self.assertRaises(TypeError, journal.append, game_data)
+        game_data['Audits']['Last Game'] = {1: 2}
+        self.assertRaises(TypeError, journal.append, game_data)
+
+    def test_save_rewrites_the_yaml_file_when_a_section_cannot_be_journaled(self):
+        (journal, game_data) = self.boot()
+        game_data['Audits']['Games Played'] = 4
+        game_data['Audits']['Ratio'] = (1, 2)
+        journal.save(game_data, self.yaml_path)
+        self.assertEqual(os.path.getsize(self.journal_path), 0)
+        with open(self.yaml_path) as f:
+            self.assertEqual(yaml.load(f, Loader=yaml.Loader)['Audits']['Games Played'], 4)
+
+    def test_failed_write_is_tried_again(self):
+        (journal, game_data) = self.boot()
+        game_data['Audits']['Games Played'] = 4
+        os.mkdir(self.journal_path)
+        self.assertRaises(EnvironmentError, journal.append, game_data)
+        os.rmdir(self.journal_path)
+
+        journal.append(game_data)
+        self.assertEqual(self.boot()[1]['Audits']['Games Played'], 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
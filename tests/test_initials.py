@@ -0,0 +1,60 @@
+import unittest
+
+try:
+    from procgame.dmd import Frame
+    from my_modes.initials import LetterWheelLayer
+except ImportError:
+    Frame = None
+
+letters = 'ABCDEFGH'
+
+
+class DotFont(object):
+    """Draws every letter as a single dot, 2 dots right and 3 dots down from where the letter starts"""
+
+    def draw(self, frame, text, x, y):
+        frame.fill_rect(x + 2, y + 3, 1, 1, (255,255,255,255))
+
+
+@unittest.skipIf(Frame is None, 'procgame is not installed')
+class LetterWheelLayerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.layer = LetterWheelLayer(letters, DotFont())
+
+    def letter_columns(self, frame):
+        # the letters are the lit dots of row 4, the box is lit at columns 61 and 68 on every row
+        return [x for x in range(frame.width) if frame.get_dot(x, 4) and x not in (61, 68)]
+
+    def test_selected_letter_lands_in_the_box(self):
+        frame = self.layer.draw_step(3, 0)
+        # letter j starts at 62 + (j - index) * letter_spread + x, the letters repeat across the display
+        self.assertEqual(self.letter_columns(frame), list(range(2 + 62 - 6 * 10, 128, 10)))
+        self.assertTrue(frame.get_dot(61, 0))
+        self.assertTrue(frame.get_dot(68, 8))
+        self.assertFalse(frame.get_dot(65, 1))
+
+    def test_letters_wrap_around_the_wheel(self):
+        frame = self.layer.draw_step(0, 0)
+        self.assertIn(2 + 62 - 10, self.letter_columns(frame))
+        self.assertIn(2 + 62, self.letter_columns(frame))
+
+    def test_step_offset_moves_every_letter(self):
+        for x in (-7, -1, 3):
+            columns = self.letter_columns(self.layer.draw_step(5, x))
+            self.assertIn(2 + 62 + x, columns)
+            self.assertIn(2 + 62 + 10 + x, columns)
+            self.assertIn(2 + 62 - 10 + x, columns)
+
+    def test_slide_ends_on_the_new_letter(self):
+        self.layer.slide_to(4, inc=1)
+        offsets = list(self.layer.steps)
+        self.assertEqual(offsets[0], (4, 9))
+        self.assertEqual(offsets[-1], (4, 0))
+        for step in offsets:
+            self.layer.next_frame()
+        self.assertEqual(self.letter_columns(self.layer.next_frame()), self.letter_columns(self.layer.draw_step(4, 0)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+import unittest
+
+try:
+    from procgame.dmd import Frame, FrameLayer, GroupedLayer
+    from layers import CachedGroupedLayer
+except ImportError:
+    Frame = None
+
+white = (255,255,255,255)
+
+
+def dot_frame(x, y):
+    frame = Frame(8, 8)
+    frame.fill_rect(x, y, 1, 1, white)
+    return frame
+
+
+@unittest.skipIf(Frame is None, 'procgame is not installed')
+class CachedGroupedLayerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.child = FrameLayer(frame=dot_frame(1, 2))
+        self.other_child = FrameLayer(frame=dot_frame(3, 3))
+        # side by side, a copy composite overwrites the whole frame under it
+        self.other_child.set_target_position(16, 0)
+        self.layer = CachedGroupedLayer(32, 16, [self.child, self.other_child])
+
+    def test_unchanged_children_reuse_the_composited_frame(self):
+        frame = self.layer.next_frame()
+        self.assertIs(self.layer.next_frame(), frame)
+        self.assertIs(self.layer.next_frame(), frame)
+        self.assertEqual((self.layer.compositions, self.layer.reuses, self.layer.generation), (1, 2, 1))
+        self.assertTrue(frame.get_dot(1, 2))
+        self.assertTrue(frame.get_dot(19, 3))
+
+    def test_new_child_frame_composites_again(self):
+        self.layer.next_frame()
+        self.child.frame = dot_frame(5, 6)
+        frame = self.layer.next_frame()
+        self.assertEqual((self.layer.compositions, self.layer.generation), (2, 2))
+        self.assertFalse(frame.get_dot(1, 2))
+        self.assertTrue(frame.get_dot(5, 6))
+
+    def test_moved_child_composites_again(self):
+        self.layer.next_frame()
+        self.child.set_target_position(10, 4)
+        frame = self.layer.next_frame()
+        self.assertEqual(self.layer.compositions, 2)
+        self.assertFalse(frame.get_dot(1, 2))
+        self.assertTrue(frame.get_dot(11, 6))
+
+    def test_composite_op_and_enabled_changes_composite_again(self):
+        self.layer.next_frame()
+        self.child.composite_op = 'blacksrc'
+        self.layer.next_frame()
+        self.other_child.enabled = False
+        frame = self.layer.next_frame()
+        self.assertEqual(self.layer.compositions, 3)
+        self.assertFalse(frame.get_dot(19, 3))
+
+    def test_nested_layer_change_reaches_the_outer_layer(self):
+        # the inner layer returns the same buffer when its content changes, its generation tells the outer layer
+        outer = CachedGroupedLayer(32, 16, [self.layer])
+        outer.next_frame()
+        self.child.frame = dot_frame(5, 6)
+        frame = outer.next_frame()
+        self.assertEqual(outer.compositions, 2)
+        self.assertTrue(frame.get_dot(5, 6))
+        outer.next_frame()
+        self.assertEqual((outer.compositions, outer.reuses), (2, 1))
+
+
+class ShiftTransition(object):
+    """Draws the child one dot further right on every frame"""
+
+    def __init__(self):
+        self.shift = 0
+
+    def next_frame(self, from_frame, to_frame):
+        self.shift += 1
+        frame = Frame(to_frame.width, to_frame.height)
+        Frame.copy_rect(dst=frame, dst_x=self.shift, dst_y=0, src=to_frame, src_x=0, src_y=0,
+                        width=to_frame.width, height=to_frame.height, op='copy')
+        return frame
+
+
+def dots(frame):
+    return [(x, y) for y in range(frame.height) for x in range(frame.width) if frame.get_dot(x, y)]
+
+
+@unittest.skipIf(Frame is None, 'procgame is not installed')
+class SameAsGroupedLayerTest(unittest.TestCase):
+    """The cached layer shows what a GroupedLayer with the same children shows"""
+
+    def children(self):
+        (child, other_child) = (FrameLayer(frame=dot_frame(1, 2)), FrameLayer(frame=dot_frame(3, 3)))
+        other_child.set_target_position(16, 0)
+        return (child, other_child)
+
+    def assert_same_frames(self, setup, num_frames=3):
+        layers = []
+        for layer_class in [GroupedLayer, CachedGroupedLayer]:
+            children = self.children()
+            setup(*children)
+            layers.append(layer_class(32, 16, list(children)))
+        for index in range(num_frames):
+            self.assertEqual(dots(layers[1].next_frame()), dots(layers[0].next_frame()))
+
+    def test_child_with_transition(self):
+        def setup(child, other_child):
+            child.transition = ShiftTransition()
+        self.assert_same_frames(setup)
+
+    def test_opaque_child_hides_the_next_children(self):
+        def setup(child, other_child):
+            child.opaque = True
+        self.assert_same_frames(setup)
+
+    def test_child_offset(self):
+        def setup(child, other_child):
+            (other_child.target_x_offset, other_child.target_y_offset) = (-4, 2)
+        self.assert_same_frames(setup)
+
+
+if __name__ == '__main__':
+    unittest.main()
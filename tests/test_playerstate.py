@@ -0,0 +1,48 @@
+import ast
+import os
+import re
+import unittest
+
+game_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# the key literals given to the player state methods and to the helpers passing them on, and the direct record accesses
+KEY_PATTERNS = [
+    re.compile(r"\b(?:get|set|adj|inc)(?:Player)?State\(\s*'([^']+)'"),
+    re.compile(r"\bcreate_item\(\s*'([^']+)'"),
+    re.compile(r"\bcreate_high_score_category\(\s*'[^']*',\s*'[^']*',\s*'([^']+)'"),
+    re.compile(r"current_player\(\)\.state\.(\w+)"),
+]
+
+
+def declared_keys():
+    # playerstate.py imports procgame, read the declaration without importing it
+    with open(os.path.join(game_path, 'playerstate.py')) as f:
+        tree = ast.parse(f.read())
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and [target.id for target in node.targets] == ['PLAYER_STATE_KEYS']:
+            return set(ast.literal_eval(node.value))
+    raise AssertionError('PLAYER_STATE_KEYS not found')
+
+
+def used_keys():
+    """Return {key: [file:line, ...]} for the keys used by the game"""
+    paths = [os.path.join(game_path, 'jd2.py')]
+    paths += [os.path.join(game_path, 'my_modes', name) for name in sorted(os.listdir(os.path.join(game_path, 'my_modes')))
+              if name.endswith('.py')]
+    keys = {}
+    for path in paths:
+        with open(path) as f:
+            for (number, line) in enumerate(f, 1):
+                for pattern in KEY_PATTERNS:
+                    for key in pattern.findall(line):
+                        keys.setdefault(key, []).append('%s:%d' % (os.path.relpath(path, game_path), number))
+    return keys
+
+
+class PlayerStateKeysTest(unittest.TestCase):
+
+    def test_used_keys_are_declared(self):
+        used = used_keys()
+        self.assertTrue(used)
+        undeclared = dict((key, places) for (key, places) in used.items() if key not in declared_keys())
+        self.assertEqual(undeclared, {}, 'keys missing from PLAYER_STATE_KEYS in playerstate.py')
@@ -0,0 +1,38 @@
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+try:
+    import pinproc
+    import procgame
+except ImportError:
+    pinproc = procgame = None
+
+game_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@unittest.skipIf(pinproc is None or procgame is None, 'the game needs procgame and pinproc')
+class ReplayTest(unittest.TestCase):
+    """A session recorded by the simulator and replayed from its switch trace plays the same game"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def final_scores(self, *args):
+        # the replay must run the same ticks as the recording
+        output = subprocess.check_output([sys.executable, 'jd2sim.py', '--tick-ms', '1'] + list(args), cwd=game_path)
+        return re.search(r'^final scores: *(.*)$', output.decode(), re.MULTILINE).group(1).split()
+
+    def test_replay_has_the_recorded_final_scores(self):
+        trace_path = os.path.join(self.directory, 'session.jdt')
+        recorded = self.final_scores('--games', '1', '--seed', '7', '--record', trace_path)
+        replayed = self.final_scores('--replay', trace_path)
+        self.assertTrue(recorded)
+        self.assertEqual(replayed, recorded)
@@ -0,0 +1,46 @@
+import os
+import shutil
+import tempfile
+import unittest
+from switchtrace import SwitchRecorder, SwitchTrace
+
+
+class SwitchTraceTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'traces', 'session.jdt')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_trace_starts_with_the_run_loop(self):
+        recorder = SwitchRecorder(self.path, 1234, [81, 82])
+        # the game took 5 seconds to build, the first pass of the run loop starts the clock
+        recorder.start(105.0)
+        recorder.start(106.0)
+        recorder.record(106.25, 13, 1)
+        recorder.record(107.0, 13, 2)
+        recorder.close()
+
+        trace = SwitchTrace(self.path)
+        self.assertEqual(trace.start_time, 105.0)
+        self.assertEqual(trace.random_seed, 1234)
+        self.assertEqual(trace.closed_switches, [81, 82])
+        self.assertEqual(trace.events, [(1.25, 13, 1), (2.0, 13, 2)])
+
+    def test_first_event_starts_the_clock(self):
+        recorder = SwitchRecorder(self.path, 1, [])
+        recorder.record(50.0, 13, 1)
+        recorder.close()
+        trace = SwitchTrace(self.path)
+        self.assertEqual((trace.start_time, trace.closed_switches, trace.events), (50.0, [], [(0.0, 13, 1)]))
+
+    def test_partial_record_is_ignored(self):
+        recorder = SwitchRecorder(self.path, 1, [])
+        recorder.record(50.0, 13, 1)
+        recorder.record(50.5, 14, 1)
+        recorder.close()
+        with open(self.path, 'rb+') as f:
+            f.truncate(os.path.getsize(self.path) - 1)
+        self.assertEqual(SwitchTrace(self.path).events, [(0.0, 13, 1)])
@@ -0,0 +1,105 @@
+from collections import defaultdict
+import logging
+import timeit
+
+class LatencyHistogram(object):
+    """Histogram of durations with a bounded relative error, in the manner of an HDR histogram.
+       Durations are counted in microseconds, exactly below 2**precision and otherwise in
+       buckets keeping the top precision bits, that is within 100/2**(precision-1) percent."""
+
+    def __init__(self, precision=5, unit='ticks'):
+        self.precision = precision
+        self.unit = unit
+        self.counts = defaultdict(int)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        usecs = int(1e6 * seconds)
+        shift = max(0, usecs.bit_length() - self.precision)
+        self.counts[(usecs >> shift) << shift] += 1
+
+    def percentile(self, percent):
+        """Return the duration in seconds below which the given percentage of the durations fall"""
+        threshold = self.count * percent / 100.0
+        seen = 0
+        for (usecs, count) in sorted(self.counts.items()):
+            seen += count
+            if seen >= threshold:
+                return usecs / 1e6
+        return 0.0
+
+    def summary(self):
+        if not self.count:
+            return 'no ' + self.unit
+        percentiles = ', '.join('p%s %.2fms' % (p, 1e3 * self.percentile(p)) for p in [50, 90, 99, 99.9])
+        return '%d %s, mean %.2fms, %s, max %.2fms' % (self.count, self.unit, 1e3 * self.total / self.count, percentiles, 1e3 * self.max)
+
+
+class TickProfiler(object):
+    """Measures every pass of the run loop, from one tick of the game to the next,
+       and attributes the time spent in the switch handlers, delayed handlers and mode_tick() of each mode class.
+       The top offenders are logged when a pass goes over the budget."""
+
+    logger = logging.getLogger('game.tickprofile')
+
+    def __init__(self, mode_queue, budget, num_offenders=5):
+        self.budget = budget
+        self.num_offenders = num_offenders
+        self.clock = timeit.default_timer
+        self.histogram = LatencyHistogram()
+        self.num_slow_ticks = 0
+        self.tick_start = None
+        self.offenders = defaultdict(float)
+        self.profiled_modes = set()
+
+        # profile the modes already running and those added later
+        for mode in mode_queue.modes:
+            self.install(mode)
+        add = mode_queue.add
+        def add_mode(mode):
+            self.install(mode)
+            return add(mode)
+        mode_queue.add = add_mode
+
+    def install(self, mode):
+        if mode not in self.profiled_modes:
+            self.profiled_modes.add(mode)
+            self.profile(mode, 'handle_event', 'switch')
+            self.profile(mode, 'dispatch_delayed', 'delayed')
+            self.profile(mode, 'mode_tick', 'mode_tick')
+
+    def profile(self, mode, method, kind):
+        call = getattr(mode, method)
+        key = (type(mode).__name__, kind)
+        def profiled(*args, **kwargs):
+            start = self.clock()
+            try:
+                return call(*args, **kwargs)
+            finally:
+                self.offenders[key] += self.clock() - start
+        setattr(mode, method, profiled)
+
+    def tick(self):
+        """Called at the beginning of every tick, this ends the measure of the previous pass of the run loop"""
+        now = self.clock()
+        if self.tick_start is not None:
+            duration = now - self.tick_start
+            self.histogram.record(duration)
+            if duration > self.budget:
+                self.num_slow_ticks += 1
+                self.log_slow_tick(duration)
+        self.tick_start = now
+        self.offenders.clear()
+
+    def log_slow_tick(self, duration):
+        offenders = sorted(self.offenders.items(), key=lambda item: -item[1])[:self.num_offenders]
+        self.logger.warning('slow tick %.2fms over budget %.2fms: %s', 1e3 * duration, 1e3 * self.budget,
+            ', '.join('%s %s %.2fms' % (mode_name, kind, 1e3 * seconds) for ((mode_name, kind), seconds) in offenders))
+
+    def summary(self):
+        return '%s, %d over budget' % (self.histogram.summary(), self.num_slow_ticks)